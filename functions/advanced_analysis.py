@@ -14,17 +14,26 @@ Include:
 - Similarità giocatori
 """
 
+import functools
+import hashlib
+import json
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+import plotly.io as pio
 from plotly.subplots import make_subplots
-from scipy import stats
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.neighbors import NearestNeighbors
 
+try:
+    import orjson
+except ImportError:  # opzionale: senza orjson si usa json della libreria standard
+    orjson = None
+
 
 # Statistiche per il radar chart giocatori (medie per partita)
 RADAR_STATS = [
@@ -55,61 +64,173 @@ CONSISTENCY_STATS = [
     ('pm_permin', 'Plus/Minus per min', 'pm'),
 ]
 
+# Regole "quando vince" mostrate per squadra (le più incisive, già ordinate
+# per differenza di win rate prima di essere incorporate nel report)
+MAX_RULES_PER_TEAM = 5
 
-def compute_consistency_metrics(overall_df, min_games=5):
+# Statistiche del profilo a percentili (similarità giocatori)
+PROFILE_STATS = ['PT', 'AS', 'RT', 'PR', 'ST']
+
+# Colori delle caselle del mini profilo, dal percentile più alto al più basso
+PROFILE_COLORS = ['#22c55e', '#84cc16', '#eab308', '#f97316', '#ef4444']
+
+
+# Cache in memoria dei compute_* (la generazione del sito li richiama più volte sugli stessi dati)
+_COMPUTE_CACHE = {}
+_COMPUTE_CACHE_SIZE = 64
+
+
+def _frame_digest(df):
     """
-    Calcola metriche di consistenza per ogni giocatore.
+    Impronta del contenuto di un DataFrame (colonne, dtype e valori).
     """
-    results = []
+    h = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode())
+    return h.hexdigest()
 
-    for (player, team), group in overall_df.groupby(['Giocatore', 'Team']):
-        if len(group) < min_games:
-            continue
 
-        row = {
-            'Giocatore': player,
-            'Team': team,
-            'Partite': len(group),
-            'MinutiTot': group['Minutes'].sum(),
-        }
+def _cached_compute(func):
+    """
+    Memorizza il risultato di una funzione compute_* in base al contenuto dei
+    DataFrame in input e agli altri parametri. Restituisce sempre una copia, così
+    il chiamante può modificare il risultato senza alterare la cache.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            key = (func.__name__,
+                   tuple(_frame_digest(a) if isinstance(a, pd.DataFrame) else a for a in args),
+                   tuple(sorted((k, _frame_digest(v) if isinstance(v, pd.DataFrame) else v)
+                                for k, v in kwargs.items())))
+            hash(key)
+        except TypeError:
+            # Dati non hashabili (es. colonne con liste): nessuna cache
+            return func(*args, **kwargs)
 
-        for stat_col, stat_name, stat_id in CONSISTENCY_STATS:
-            if stat_col not in group.columns:
-                continue
+        if key not in _COMPUTE_CACHE:
+            if len(_COMPUTE_CACHE) >= _COMPUTE_CACHE_SIZE:
+                _COMPUTE_CACHE.pop(next(iter(_COMPUTE_CACHE)))
+            _COMPUTE_CACHE[key] = func(*args, **kwargs)
+
+        result = _COMPUTE_CACHE[key]
+        return result.copy() if isinstance(result, pd.DataFrame) else result
+
+    return wrapper
+
+
+def _with_categories(df):
+    """
+    Ritorna df con Team, Opponent e Giocatore come category (groupby e merge
+    lavorano su codici interi). Team e Opponent condividono le categorie.
+    Il DataFrame originale non viene modificato.
+    """
+    converted = {}
+
+    team_cols = [c for c in ('Team', 'Opponent')
+                 if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if team_cols:
+        teams = pd.concat([df[c] for c in team_cols]).dropna().unique()
+        team_dtype = pd.CategoricalDtype(sorted(teams))
+        for c in team_cols:
+            converted[c] = df[c].astype(team_dtype)
+
+    if 'Giocatore' in df.columns and not isinstance(df['Giocatore'].dtype, pd.CategoricalDtype):
+        converted['Giocatore'] = df['Giocatore'].astype('category')
+
+    return df.assign(**converted) if converted else df
+
+
+def prepare_overall_df(overall_df):
+    """
+    Prepara overall_df una sola volta per tutte le funzioni compute_*:
+    ordinamento cronologico stabile per Data (se presente) e chiavi category.
+    Le funzioni accettano anche il frame grezzo, ma rifanno questo lavoro.
+    """
+    df = _with_categories(overall_df)
+    if 'Data' in df.columns and not df['Data'].is_monotonic_increasing:
+        df = df.sort_values('Data', kind='stable').reset_index(drop=True)
+    return df
 
-            values = group[stat_col].dropna()
-            if len(values) < min_games:
-                continue
 
-            mean_val = values.mean()
-            std_val = values.std()
+def _percentile_rank(reference, values):
+    """
+    Equivalente vettoriale di stats.percentileofscore(reference, v, kind='rank')
+    per ogni v in values. I NaN sono esclusi dal riferimento e restituiscono NaN.
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    sorted_ref = np.sort(reference[~np.isnan(reference)])
+    if len(sorted_ref) == 0:
+        return np.full(values.shape, np.nan)
+
+    left = np.searchsorted(sorted_ref, values, side='left')
+    right = np.searchsorted(sorted_ref, values, side='right')
+    pct = (left + right + (right > left)) * (50.0 / len(sorted_ref))
+    return np.where(np.isnan(values), np.nan, pct)
+
+
+def _downcast(df, int_cols):
+    """
+    Ritorna df con le colonne di conteggio (PT, AS, ...) ridotte al tipo intero
+    più piccolo possibile. Le colonne con decimali o NaN restano float64, quindi
+    la conversione non perde precisione. Il DataFrame originale non viene modificato.
+    """
+    converted = {c: pd.to_numeric(df[c], downcast='integer')
+                 for c in int_cols if c in df.columns and pd.api.types.is_numeric_dtype(df[c])}
+    return df.assign(**converted) if converted else df
+
+
+@_cached_compute
+def compute_consistency_metrics(overall_df, min_games=5):
+    """
+    Calcola metriche di consistenza per ogni giocatore.
+    """
+    stat_cols = [c for c, _, _ in CONSISTENCY_STATS if c in overall_df.columns]
+    overall_df = _downcast(_with_categories(overall_df), stat_cols)
+
+    # Scarta subito i giocatori con meno di min_games partite, prima delle aggregazioni
+    n_games = overall_df.groupby(['Giocatore', 'Team'], sort=False, observed=True)['Team'].transform('size')
+    overall_df = overall_df[(n_games >= min_games).to_numpy()]
+
+    # Un'unica aggregazione per tutte le statistiche (niente loop per giocatore)
+    grouped = overall_df.groupby(['Giocatore', 'Team'], sort=False, observed=True)
+    agg = grouped[stat_cols].agg(['mean', 'std', 'count'])
+
+    df = pd.DataFrame({
+        'Partite': grouped.size(),
+        'MinutiTot': grouped['Minutes'].sum(),
+    })
 
-            if stat_col == 'pm_permin' or mean_val == 0:
-                cv = std_val * 100
-            else:
-                cv = (std_val / abs(mean_val) * 100)
+    for stat_col in stat_cols:
+        # Statistica valida solo con almeno min_games valori non nulli
+        valid = agg[(stat_col, 'count')] >= min_games
+        mean_val = agg[(stat_col, 'mean')].where(valid)
+        std_val = agg[(stat_col, 'std')].where(valid)
 
-            row[f'{stat_col}_mean'] = mean_val
-            row[f'{stat_col}_std'] = std_val
-            row[f'{stat_col}_cv'] = cv
+        if stat_col == 'pm_permin':
+            cv = std_val * 100
+        else:
+            cv = (std_val / mean_val.abs() * 100).where(mean_val != 0, std_val * 100)
 
-        results.append(row)
+        df[f'{stat_col}_mean'] = mean_val
+        df[f'{stat_col}_std'] = std_val
+        df[f'{stat_col}_cv'] = cv
 
-    df = pd.DataFrame(results)
+    df = df.reset_index()
 
     for stat_col, stat_name, stat_id in CONSISTENCY_STATS:
         cv_col = f'{stat_col}_cv'
         if cv_col in df.columns:
-            valid_cv = df[cv_col].dropna()
-            if len(valid_cv) > 0:
-                df[f'{stat_col}_consistency'] = df[cv_col].apply(
-                    lambda x: 100 - stats.percentileofscore(valid_cv, x, kind='rank')
-                    if pd.notna(x) else np.nan
-                )
+            # Arrotondato prima del rank: i CV uguali in teoria ma diversi per pochi
+            # ulp (ordine delle somme nel groupby) restano a pari merito
+            cv = np.round(df[cv_col].to_numpy(dtype=np.float64), 9)
+            if not np.isnan(cv).all():
+                df[f'{stat_col}_consistency'] = 100 - _percentile_rank(cv, cv)
 
     return df
 
 
+@_cached_compute
 def compute_recent_form(overall_df, n_recent=5, min_games=8):
     """
     Calcola la forma recente: media ultime N partite vs media stagione.
@@ -117,42 +238,37 @@ def compute_recent_form(overall_df, n_recent=5, min_games=8):
     Returns:
         DataFrame con colonne: Giocatore, Team, PT_season, PT_recent, PT_diff, ...
     """
-    results = []
+    overall_df = _with_categories(overall_df)
 
-    # Ordina per data se disponibile, altrimenti assume ordine cronologico
-    if 'Data' in overall_df.columns:
-        overall_df = overall_df.sort_values('Data')
+    # Statistiche da confrontare
+    stat_cols = [c for c in ['PT', 'AS', 'RT'] if c in overall_df.columns]
 
-    for (player, team), group in overall_df.groupby(['Giocatore', 'Team']):
-        if len(group) < min_games:
-            continue
+    # Ordina per data se disponibile (e non già ordinato da prepare_overall_df),
+    # altrimenti assume ordine cronologico
+    if 'Data' in overall_df.columns and not overall_df['Data'].is_monotonic_increasing:
+        overall_df = overall_df.sort_values('Data', kind='stable')
 
-        # Ultime n partite
-        recent = group.tail(n_recent)
+    grouped = overall_df.groupby(['Giocatore', 'Team'], sort=False, observed=True)
+    season = grouped[stat_cols].mean()
 
-        row = {
-            'Giocatore': player,
-            'Team': team,
-            'Partite': len(group),
-        }
+    # Ultime n partite: posizione contata dalla fine di ogni gruppo
+    from_end = grouped.cumcount(ascending=False)
+    recent = (overall_df[from_end < n_recent]
+              .groupby(['Giocatore', 'Team'], sort=False, observed=True)[stat_cols].mean())
 
-        # Statistiche da confrontare
-        for stat in ['PT', 'AS', 'RT']:
-            if stat not in group.columns:
-                continue
-            season_avg = group[stat].mean()
-            recent_avg = recent[stat].mean()
-            diff = recent_avg - season_avg
-            diff_pct = (diff / season_avg * 100) if season_avg > 0 else 0
+    df = pd.DataFrame({'Partite': grouped.size()})
 
-            row[f'{stat}_season'] = season_avg
-            row[f'{stat}_recent'] = recent_avg
-            row[f'{stat}_diff'] = diff
-            row[f'{stat}_diff_pct'] = diff_pct
+    for stat in stat_cols:
+        season_avg = season[stat]
+        recent_avg = recent[stat]
+        diff = recent_avg - season_avg
 
-        results.append(row)
+        df[f'{stat}_season'] = season_avg
+        df[f'{stat}_recent'] = recent_avg
+        df[f'{stat}_diff'] = diff
+        df[f'{stat}_diff_pct'] = (diff / season_avg * 100).where(season_avg > 0, 0)
 
-    return pd.DataFrame(results)
+    return df[df['Partite'] >= min_games].reset_index()
 
 
 def create_form_chart(form_df, stat='PT', top_n=20):
@@ -167,12 +283,10 @@ def create_form_chart(form_df, stat='PT', top_n=20):
         return None
 
     # Filtra giocatori con almeno 8 punti di media (evita rumore)
-    df = form_df[form_df[season_col] >= 5].copy()
+    df = form_df[form_df[season_col] >= 5]
 
-    # Prendi i più caldi e i più freddi
-    hot = df.nlargest(top_n // 2, diff_col)
-    cold = df.nsmallest(top_n // 2, diff_col)
-    df = pd.concat([hot, cold]).drop_duplicates()
+    # Prendi le variazioni più marcate (in crescita o in calo) con un'unica selezione
+    df = df.loc[df[diff_col].abs().nlargest(top_n).index]
     df = df.sort_values(diff_col, ascending=True)
 
     # Colori: verde se positivo, rosso se negativo
@@ -182,13 +296,13 @@ def create_form_chart(form_df, stat='PT', top_n=20):
 
     fig.add_trace(go.Bar(
         x=df[diff_col],
-        y=[f"{row['Giocatore']} ({row['Team'][:3]})" for _, row in df.iterrows()],
+        y=[f"{g} ({t[:3]})" for g, t in zip(df['Giocatore'].to_numpy(), df['Team'].to_numpy())],
         orientation='h',
         marker_color=colors,
         text=[f"{d:+.1f}" for d in df[diff_col]],
         textposition='outside',
         hovertemplate='<b>%{y}</b><br>Stagione: %{customdata[0]:.1f}<br>Ultime 5: %{customdata[1]:.1f}<br>Diff: %{x:+.1f}<extra></extra>',
-        customdata=df[[season_col, recent_col]].values,
+        customdata=df[[season_col, recent_col]].to_numpy(),
     ))
 
     fig.update_layout(
@@ -202,49 +316,44 @@ def create_form_chart(form_df, stat='PT', top_n=20):
     return fig
 
 
+@_cached_compute
 def compute_home_away_splits(overall_df, min_games=3):
     """
     Calcola differenze casa/trasferta per ogni giocatore.
     Usa Gap medio per partita come proxy: Gap positivo = casa, negativo = trasferta.
     """
-    results = []
+    overall_df = _with_categories(overall_df)
+    stat_cols = [c for c in ['PT', 'AS', 'RT', 'Minutes'] if c in overall_df.columns]
 
-    # Prima calcola il Gap medio per partita (Team, Opponent, Gap)
-    game_gaps = overall_df.groupby(['Team', 'Opponent', 'Gap']).size().reset_index()[['Team', 'Opponent', 'Gap']]
-
-    # Crea un mapping partita -> location basato sul Gap
+    # Mapping partita -> location basato sul Gap
     # Se Gap > 0, probabilmente in casa. Se Gap < 0, probabilmente in trasferta.
-    overall_df = overall_df.copy()
-    overall_df['Location'] = overall_df['Gap'].apply(lambda x: 'H' if x > 0 else 'A')
-
-    for (player, team), group in overall_df.groupby(['Giocatore', 'Team']):
-        home = group[group['Location'] == 'H']
-        away = group[group['Location'] == 'A']
+    is_home = overall_df['Gap'].to_numpy() > 0
 
-        if len(home) < min_games or len(away) < min_games:
-            continue
+    # Tiene solo i giocatori con almeno min_games partite sia in casa sia in trasferta,
+    # prima dell'aggregazione
+    home_by_player = pd.Series(is_home, index=overall_df.index).groupby(
+        [overall_df['Giocatore'], overall_df['Team']], sort=False, observed=True)
+    n_home = home_by_player.transform('sum')
+    n_away = home_by_player.transform('size') - n_home
+    keep = ((n_home >= min_games) & (n_away >= min_games)).to_numpy()
+    overall_df = overall_df[keep]
 
-        row = {
-            'Giocatore': player,
-            'Team': team,
-            'G_casa': len(home),
-            'G_trasf': len(away),
-        }
+    location = pd.Series(np.where(is_home[keep], 'H', 'A'), index=overall_df.index, name='Location')
 
-        for stat in ['PT', 'AS', 'RT', 'Minutes']:
-            if stat not in group.columns:
-                continue
-            home_avg = home[stat].mean()
-            away_avg = away[stat].mean()
-            diff = home_avg - away_avg
+    # Un'unica aggregazione per (giocatore, squadra, location), senza copiare il frame
+    grouped = overall_df.groupby([overall_df['Giocatore'], overall_df['Team'], location],
+                                 sort=False, observed=True)
+    means = grouped[stat_cols].mean().unstack('Location')
+    sizes = grouped.size().unstack('Location', fill_value=0).reindex(columns=['H', 'A'], fill_value=0)
 
-            row[f'{stat}_casa'] = home_avg
-            row[f'{stat}_trasf'] = away_avg
-            row[f'{stat}_diff'] = diff
+    df = pd.DataFrame({'G_casa': sizes['H'], 'G_trasf': sizes['A']})
 
-        results.append(row)
+    for stat in stat_cols:
+        df[f'{stat}_casa'] = means.get((stat, 'H'), np.nan)
+        df[f'{stat}_trasf'] = means.get((stat, 'A'), np.nan)
+        df[f'{stat}_diff'] = df[f'{stat}_casa'] - df[f'{stat}_trasf']
 
-    return pd.DataFrame(results)
+    return df.reset_index()
 
 
 def create_home_away_chart(ha_df, stat='PT', top_n=25):
@@ -259,9 +368,7 @@ def create_home_away_chart(ha_df, stat='PT', top_n=25):
         return None
 
     # Ordina per differenza assoluta
-    df = ha_df.copy()
-    df['abs_diff'] = df[diff_col].abs()
-    df = df.nlargest(top_n, 'abs_diff')
+    df = ha_df.loc[ha_df[diff_col].abs().nlargest(top_n).index]
     df = df.sort_values(diff_col, ascending=True)
 
     # Colori
@@ -271,13 +378,13 @@ def create_home_away_chart(ha_df, stat='PT', top_n=25):
 
     fig.add_trace(go.Bar(
         x=df[diff_col],
-        y=[f"{row['Giocatore']} ({row['Team'][:3]})" for _, row in df.iterrows()],
+        y=[f"{g} ({t[:3]})" for g, t in zip(df['Giocatore'].to_numpy(), df['Team'].to_numpy())],
         orientation='h',
         marker_color=colors,
         text=[f"{d:+.1f}" for d in df[diff_col]],
         textposition='outside',
         hovertemplate='<b>%{y}</b><br>Casa: %{customdata[0]:.1f}<br>Trasferta: %{customdata[1]:.1f}<br>Diff: %{x:+.1f}<extra></extra>',
-        customdata=df[[casa_col, trasf_col]].values,
+        customdata=df[[casa_col, trasf_col]].to_numpy(),
     ))
 
     fig.update_layout(
@@ -303,59 +410,46 @@ def create_home_away_chart(ha_df, stat='PT', top_n=25):
     return fig
 
 
+@_cached_compute
 def compute_team_dependency(overall_df, player_stats):
     """
     Calcola quanto ogni squadra dipende dai top scorer (punti e minuti).
     """
-    results = []
+    player_stats = _with_categories(player_stats)
+    players = player_stats[player_stats['Team'].isin(overall_df['Team'].unique())]
+    grouped = players.groupby('Team', sort=False, observed=True)
+    totals = grouped[['PT', 'Minutes']].sum()
 
-    for team in overall_df['Team'].unique():
-        team_players = player_stats[player_stats['Team'] == team].copy()
-        if len(team_players) < 3:
-            continue
+    # Posizione del giocatore nella squadra (1 = primo per la statistica),
+    # calcolata una sola volta per entrambe le statistiche
+    ranks = grouped[['PT', 'Minutes']].rank(method='first', ascending=False)
+    players = players.assign(rk_pt=ranks['PT'], rk_min=ranks['Minutes'])
 
-        # === PUNTI ===
-        team_by_pts = team_players.sort_values('PT', ascending=False)
-        total_pts = team_by_pts['PT'].sum()
-        if total_pts == 0:
-            continue
+    df = pd.DataFrame({'Giocatori': grouped.size()})
 
-        top1_pts = team_by_pts.iloc[0]['PT']
-        top2_pts = team_by_pts.iloc[:2]['PT'].sum()
-        top3_pts = team_by_pts.iloc[:3]['PT'].sum()
+    for stat_col, prefix, rk_col in [('PT', 'PT', 'rk_pt'), ('Minutes', 'MIN', 'rk_min')]:
+        total = totals[stat_col]
 
-        # === MINUTI ===
-        team_by_min = team_players.sort_values('Minutes', ascending=False)
-        total_min = team_by_min['Minutes'].sum()
+        top = players[players[rk_col] <= 3]
+        names = top.pivot(index='Team', columns=rk_col, values='Giocatore')
+        cum_vals = (top.pivot(index='Team', columns=rk_col, values=stat_col)
+                    .reindex(columns=[1, 2, 3], fill_value=0).fillna(0).cumsum(axis=1))
 
-        top1_min = team_by_min.iloc[0]['Minutes']
-        top2_min = team_by_min.iloc[:2]['Minutes'].sum()
-        top3_min = team_by_min.iloc[:3]['Minutes'].sum()
+        df[f'{prefix}_totali'] = total
+        for k in (1, 2, 3):
+            df[f'{prefix}_Top{k}_nome'] = names.get(k, '')
+        for k in (1, 2, 3):
+            df[f'{prefix}_Top{k}_pct'] = cum_vals[k] / total * 100
+        df[f'{prefix}_Altri_pct'] = (total - cum_vals[3]) / total * 100
 
-        results.append({
-            'Team': team,
-            'Giocatori': len(team_players),
-            # Punti
-            'PT_totali': total_pts,
-            'PT_Top1_nome': team_by_pts.iloc[0]['Giocatore'],
-            'PT_Top2_nome': team_by_pts.iloc[1]['Giocatore'] if len(team_by_pts) >= 2 else '',
-            'PT_Top3_nome': team_by_pts.iloc[2]['Giocatore'] if len(team_by_pts) >= 3 else '',
-            'PT_Top1_pct': top1_pts / total_pts * 100,
-            'PT_Top2_pct': top2_pts / total_pts * 100,
-            'PT_Top3_pct': top3_pts / total_pts * 100,
-            'PT_Altri_pct': (total_pts - top3_pts) / total_pts * 100,
-            # Minuti
-            'MIN_totali': total_min,
-            'MIN_Top1_nome': team_by_min.iloc[0]['Giocatore'],
-            'MIN_Top2_nome': team_by_min.iloc[1]['Giocatore'] if len(team_by_min) >= 2 else '',
-            'MIN_Top3_nome': team_by_min.iloc[2]['Giocatore'] if len(team_by_min) >= 3 else '',
-            'MIN_Top1_pct': top1_min / total_min * 100 if total_min > 0 else 0,
-            'MIN_Top2_pct': top2_min / total_min * 100 if total_min > 0 else 0,
-            'MIN_Top3_pct': top3_min / total_min * 100 if total_min > 0 else 0,
-            'MIN_Altri_pct': (total_min - top3_min) / total_min * 100 if total_min > 0 else 0,
-        })
+        if prefix == 'MIN':
+            pct_cols = [f'MIN_Top{k}_pct' for k in (1, 2, 3)] + ['MIN_Altri_pct']
+            df[pct_cols] = df[pct_cols].where(df['MIN_totali'] > 0, 0)
 
-    return pd.DataFrame(results)
+    df = df.reindex(pd.Index(overall_df['Team'].unique(), name='Team'))
+    df = df[(df['Giocatori'] >= 3) & (df['PT_totali'] != 0)]
+
+    return df.reset_index()
 
 
 def create_dependency_chart(dep_df, stat_type='PT'):
@@ -390,7 +484,8 @@ def create_dependency_chart(dep_df, stat_type='PT'):
         name='1°',
         orientation='h',
         marker_color='#302B8F',
-        text=[f"{' '.join(row[top1_nome].split()[1:])}: {row[top1_col]:.0f}%" for _, row in df.iterrows()],
+        text=[f"{' '.join(n.split()[1:])}: {p:.0f}%"
+              for n, p in zip(df[top1_nome].to_numpy(), df[top1_col].to_numpy())],
         textposition='inside',
         insidetextanchor='middle',
     ))
@@ -401,7 +496,8 @@ def create_dependency_chart(dep_df, stat_type='PT'):
         name='2°',
         orientation='h',
         marker_color='#00F95B',
-        text=[f"{' '.join(row[top2_nome].split()[1:])}: {row[top2_col] - row[top1_col]:.0f}%" for _, row in df.iterrows()],
+        text=[f"{' '.join(n.split()[1:])}: {p:.0f}%"
+              for n, p in zip(df[top2_nome].to_numpy(), (df[top2_col] - df[top1_col]).to_numpy())],
         textposition='inside',
         insidetextanchor='middle',
     ))
@@ -412,7 +508,8 @@ def create_dependency_chart(dep_df, stat_type='PT'):
         name='3°',
         orientation='h',
         marker_color='#60a5fa',
-        text=[f"{' '.join(row[top3_nome].split()[1:])}: {row[top3_col] - row[top2_col]:.0f}%" for _, row in df.iterrows()],
+        text=[f"{' '.join(n.split()[1:])}: {p:.0f}%"
+              for n, p in zip(df[top3_nome].to_numpy(), (df[top3_col] - df[top2_col]).to_numpy())],
         textposition='inside',
         insidetextanchor='middle',
     ))
@@ -444,32 +541,25 @@ def compute_team_stats(overall_df):
     Calcola statistiche aggregate per squadra (per partita).
     """
     # Controlla quali colonne esistono
-    agg_cols = {
-        'PT': 'sum',
-        'AS': 'sum',
-        'RT': 'sum',
-        'RO': 'sum',
-        'RD': 'sum',
-        'PR': 'sum',
-        'ST': 'sum',
-    }
+    sum_cols = ['PT', 'AS', 'RT', 'RO', 'RD', 'PR', 'ST']
 
     # Aggiungi colonne tiro se esistono
-    if '2PTM' in overall_df.columns:
-        agg_cols['2PTM'] = 'sum'
-        agg_cols['2PTA'] = 'sum'
-    if '3PTM' in overall_df.columns:
-        agg_cols['3PTM'] = 'sum'
-        agg_cols['3PTA'] = 'sum'
-    if 'FTM' in overall_df.columns:
-        agg_cols['FTM'] = 'sum'
-        agg_cols['FTA'] = 'sum'
-
-    # Raggruppa per squadra e partita, poi media
-    team_game = overall_df.groupby(['Team', 'Opponent', 'Gap']).agg(agg_cols).reset_index()
-
-    # Media per partita
-    team_stats = team_game.groupby('Team').mean(numeric_only=True).reset_index()
+    for made_col, att_col in [('2PTM', '2PTA'), ('3PTM', '3PTA'), ('FTM', 'FTA')]:
+        if made_col in overall_df.columns:
+            sum_cols += [made_col, att_col]
+
+    # Media per partita = somma stagionale / numero di partite della squadra:
+    # evita di materializzare il DataFrame intermedio (squadra, partita)
+    game_keys = ['Team', 'Opponent', 'Gap']
+    rows = overall_df[overall_df[game_keys].notna().all(axis=1)]
+    games = rows[game_keys].drop_duplicates()
+    games_by_team = games.groupby('Team', sort=False, observed=True)
+
+    sums = rows.groupby('Team', sort=False, observed=True)[sum_cols].sum()
+    team_stats = sums.div(games_by_team.size(), axis=0)
+    team_stats.insert(0, 'Gap', games_by_team['Gap'].mean())
+    # Ordina solo il risultato (una riga per squadra)
+    team_stats = team_stats.sort_index().reset_index()
 
     # Calcola percentuali
     if '2PTM' in team_stats.columns and '2PTA' in team_stats.columns:
@@ -486,7 +576,7 @@ def create_team_radar_chart(team_stats, team_names, title="Confronto Squadre"):
     """
     Crea radar chart per confrontare squadre.
     """
-    teams_df = team_stats[team_stats['Team'].isin(team_names)].copy()
+    teams_df = team_stats[team_stats['Team'].isin(team_names)]
 
     if len(teams_df) == 0:
         return None
@@ -496,20 +586,18 @@ def create_team_radar_chart(team_stats, team_names, title="Confronto Squadre"):
     fig = go.Figure()
     colors = ['#302B8F', '#00F95B', '#f97316', '#ef4444']
 
-    for i, (_, team) in enumerate(teams_df.iterrows()):
-        values = []
-        for stat_col, _ in TEAM_RADAR_STATS:
-            if stat_col not in team_stats.columns:
-                values.append(50)
-                continue
-            all_values = team_stats[stat_col].dropna()
-            team_val = team[stat_col]
-            if pd.isna(team_val):
-                pct = 50
-            else:
-                pct = stats.percentileofscore(all_values, team_val, kind='rank')
-            values.append(pct)
+    # Percentili calcolati una sola volta per statistica, per tutte le squadre selezionate
+    pct_by_stat = []
+    for stat_col, _ in TEAM_RADAR_STATS:
+        if stat_col not in team_stats.columns:
+            pct_by_stat.append(np.full(len(teams_df), 50.0))
+            continue
+        pct = _percentile_rank(team_stats[stat_col], teams_df[stat_col])
+        pct_by_stat.append(np.where(np.isnan(pct), 50.0, pct))
+    pct_matrix = np.column_stack(pct_by_stat)
 
+    for i, team_name in enumerate(teams_df['Team'].tolist()):
+        values = pct_matrix[i].tolist()
         values.append(values[0])
         cats = categories + [categories[0]]
 
@@ -519,7 +607,7 @@ def create_team_radar_chart(team_stats, team_names, title="Confronto Squadre"):
             fill='toself',
             fillcolor=colors[i % len(colors)].replace('#', 'rgba(') + ', 0.2)' if colors[i].startswith('#') else colors[i],
             line=dict(color=colors[i], width=2),
-            name=team['Team']
+            name=team_name
         ))
 
     fig.update_layout(
@@ -543,33 +631,31 @@ def compute_shot_distribution(player_stats):
     """
     Calcola distribuzione tiri per giocatore (2PT, 3PT, FT).
     """
-    df = player_stats.copy()
+    cols = player_stats.columns
 
     # Controlla nomi colonne
-    att_2pt = '2PTA' if '2PTA' in df.columns else '2PT_att'
-    att_3pt = '3PTA' if '3PTA' in df.columns else '3PT_att'
-    att_ft = 'FTA' if 'FTA' in df.columns else 'FT_att'
-    made_2pt = '2PTM' if '2PTM' in df.columns else '2PT_made'
-    made_3pt = '3PTM' if '3PTM' in df.columns else '3PT_made'
-    made_ft = 'FTM' if 'FTM' in df.columns else 'FT_made'
-
-    # Copia le colonne con nomi standard
-    if att_2pt in df.columns:
-        df['2PT_att'] = df[att_2pt]
-        df['2PT_made'] = df[made_2pt]
-        df['2PT_eff'] = np.where(df['2PT_att'] > 0, df['2PT_made'] / df['2PT_att'] * 100, 0)
-        df['2PT_exp'] = df['2PT_eff'] / 100 * 2
-
-    if att_3pt in df.columns:
-        df['3PT_att'] = df[att_3pt]
-        df['3PT_made'] = df[made_3pt]
-        df['3PT_eff'] = np.where(df['3PT_att'] > 0, df['3PT_made'] / df['3PT_att'] * 100, 0)
-        df['3PT_exp'] = df['3PT_eff'] / 100 * 3
-
-    if att_ft in df.columns:
-        df['FT_att'] = df[att_ft]
-        df['FT_made'] = df[made_ft]
-        df['FT_eff'] = np.where(df['FT_att'] > 0, df['FT_made'] / df['FT_att'] * 100, 0)
+    att_2pt = '2PTA' if '2PTA' in cols else '2PT_att'
+    att_3pt = '3PTA' if '3PTA' in cols else '3PT_att'
+    att_ft = 'FTA' if 'FTA' in cols else 'FT_att'
+    made_2pt = '2PTM' if '2PTM' in cols else '2PT_made'
+    made_3pt = '3PTM' if '3PTM' in cols else '3PT_made'
+    made_ft = 'FTM' if 'FTM' in cols else 'FT_made'
+
+    # Output ridotto: solo identificativi e colonne tiro con nomi standard
+    df = pd.DataFrame({c: player_stats[c] for c in ['Giocatore', 'Team', 'Minutes'] if c in cols},
+                      index=player_stats.index)
+
+    for shot, att, made, pts in [('2PT', att_2pt, made_2pt, 2), ('3PT', att_3pt, made_3pt, 3),
+                                 ('FT', att_ft, made_ft, None)]:
+        if att not in cols:
+            continue
+        att_vals = player_stats[att]
+        made_vals = player_stats[made]
+        df[f'{shot}_att'] = att_vals
+        df[f'{shot}_made'] = made_vals
+        df[f'{shot}_eff'] = np.where(att_vals > 0, made_vals / att_vals * 100, 0)
+        if pts is not None:
+            df[f'{shot}_exp'] = df[f'{shot}_eff'] / 100 * pts
 
     return df
 
@@ -617,7 +703,7 @@ def create_shot_chart(shot_df, shot_type='3PT', min_att=15, top_n=40):
             line=dict(width=1, color='white'),
         ),
         text=df['Giocatore'],
-        customdata=np.stack([df['Team'], df[made_col], df[att_col], df[eff_col], df['att_permin']], axis=-1),
+        customdata=df[['Team', made_col, att_col, eff_col, 'att_permin']].to_numpy(),
         hovertemplate='<b>%{text}</b><br>' +
                       'Team: %{customdata[0]}<br>' +
                       'Realizzati: %{customdata[1]:.0f}/%{customdata[2]:.0f}<br>' +
@@ -664,8 +750,8 @@ def create_consistency_plot(consistency_df, stat='PT', stat_name='Punti', top_n=
               for score in df[consistency_col]]
 
     # Testo: media | consistenza
-    bar_text = [f"{row[mean_col]:.1f} avg | {row[consistency_col]:.0f} cons"
-                for _, row in df.iterrows()]
+    bar_text = [f"{m:.1f} avg | {c:.0f} cons"
+                for m, c in zip(df[mean_col].to_numpy(), df[consistency_col].to_numpy())]
 
     fig = go.Figure()
 
@@ -677,7 +763,7 @@ def create_consistency_plot(consistency_df, stat='PT', stat_name='Punti', top_n=
             marker_color=colors,
             text=bar_text,
             textposition='outside',
-            customdata=np.stack([df[mean_col], df[consistency_col]], axis=-1),
+            customdata=df[[mean_col, consistency_col]].to_numpy(),
             hovertemplate='<b>%{y}</b><br>Media: %{customdata[0]:.1f}<br>Consistenza: %{customdata[1]:.0f}/100<extra></extra>'
         )
     )
@@ -699,42 +785,37 @@ def create_consistency_plot(consistency_df, stat='PT', stat_name='Punti', top_n=
 
 # ========== CORRELAZIONI E ANALISI VITTORIA A LIVELLO SQUADRA ==========
 
+@_cached_compute
 def compute_team_game_stats(overall_df):
     """
     Aggrega statistiche a livello squadra per ogni partita.
     Include anche statistiche degli avversari.
     """
     # Parse tiri da colonne formato "made/attempted"
-    df = overall_df.copy()
-
-    def parse_shots(val):
-        if pd.isna(val) or val == '':
-            return 0, 0
-        parts = str(val).split('/')
-        if len(parts) == 2:
-            try:
-                return int(parts[0]), int(parts[1])
-            except:
-                return 0, 0
-        return 0, 0
-
-    # Crea colonne made/attempted se non esistono
+    df = _with_categories(overall_df)
+
+    # Crea colonne made/attempted se non esistono (valori non validi -> 0);
+    # aggiunte con assign per non copiare né modificare il frame originale
+    parsed_cols = {}
     for shot_col, made_col, att_col in [('2PT', '2PTM', '2PTA'), ('3PT', '3PTM', '3PTA'), ('TL', 'FTM', 'FTA')]:
         if shot_col in df.columns and made_col not in df.columns:
-            parsed = df[shot_col].apply(parse_shots)
-            df[made_col] = parsed.apply(lambda x: x[0])
-            df[att_col] = parsed.apply(lambda x: x[1])
+            parsed = df[shot_col].astype(str).str.extract(r'^\s*(\d+)\s*/\s*(\d+)\s*$')
+            parsed_cols[made_col] = pd.to_numeric(parsed[0], errors='coerce').fillna(0).astype('int32')
+            parsed_cols[att_col] = pd.to_numeric(parsed[1], errors='coerce').fillna(0).astype('int32')
+    if parsed_cols:
+        df = df.assign(**parsed_cols)
 
     game_cols = ['Team', 'Opponent', 'Gap']
     stat_cols = ['PT', 'AS', 'RT', 'PR', 'ST', 'FF', '2PTM', '2PTA', '3PTM', '3PTA', 'FTM', 'FTA']
     stat_cols = [c for c in stat_cols if c in df.columns]
+    df = _downcast(df, stat_cols)
 
     # Aggrega per partita (squadra)
     agg_dict = {col: 'sum' for col in stat_cols}
     if 'Result' in df.columns:
         agg_dict['Result'] = 'first'
 
-    team_games = df.groupby(game_cols).agg(agg_dict).reset_index()
+    team_games = df.groupby(game_cols, sort=False, observed=True).agg(agg_dict).sort_index().reset_index()
 
     # Calcola percentuali
     if '2PTA' in team_games.columns and team_games['2PTA'].sum() > 0:
@@ -750,20 +831,16 @@ def compute_team_game_stats(overall_df):
         team_games['Win'] = (team_games['Gap'] > 0).astype(int)
 
     # Aggiungi statistiche avversari (lookup inverso)
-    # Per ogni partita Team vs Opponent, trova la riga Opponent vs Team
-    opp_cols = ['Team', 'Opponent', 'Gap', 'PT', 'AS', 'RT', 'PR', 'ST']
-    if '3PTM' in team_games.columns:
-        opp_cols.append('3PTM')
-
-    opp_stats = team_games[[c for c in opp_cols if c in team_games.columns]].copy()
-
-    # Rinomina per merge inverso
-    rename_map = {'Team': 'Opponent', 'Opponent': 'Team', 'Gap': 'Gap_opp',
-                  'PT': 'OPP_PT', 'AS': 'OPP_AS', 'RT': 'OPP_RT', 'PR': 'OPP_PR', 'ST': 'OPP_ST'}
-    if '3PTM' in opp_stats.columns:
-        rename_map['3PTM'] = 'OPP_3PTM'
-    opp_stats = opp_stats.rename(columns=rename_map)
-    opp_stats['Gap_opp'] = -opp_stats['Gap_opp']  # Inverti il gap
+    # Per ogni partita Team vs Opponent, trova la riga Opponent vs Team.
+    # Il frame avversari contiene solo le colonne necessarie, con Team/Opponent
+    # scambiati direttamente (categorie condivise: merge su codici interi)
+    opp_stat_cols = [c for c in ['PT', 'AS', 'RT', 'PR', 'ST', '3PTM'] if c in team_games.columns]
+    opp_stats = pd.DataFrame({
+        'Opponent': team_games['Team'],
+        'Team': team_games['Opponent'],
+        'Gap_opp': -team_games['Gap'],  # Inverti il gap
+        **{f'OPP_{c}': team_games[c] for c in opp_stat_cols},
+    })
 
     # Merge usando anche il Gap (che è stato invertito) per evitare duplicati
     team_games = team_games.merge(
@@ -812,8 +889,7 @@ def create_win_correlation_chart(corr_df):
         '3PTM': 'Triple Segnate'
     }
 
-    df = corr_df.copy()
-    df['Label'] = df['Statistica'].map(lambda x: labels.get(x, x))
+    df = corr_df.assign(Label=corr_df['Statistica'].map(labels).fillna(corr_df['Statistica']))
     df = df.sort_values('Correlazione', ascending=True)
 
     colors = ['#22c55e' if c > 0 else '#ef4444' for c in df['Correlazione']]
@@ -846,6 +922,10 @@ def compute_win_vs_loss_diff_by_team(team_games):
     """
     Calcola differenze medie tra vittorie e sconfitte PER OGNI SQUADRA.
     Include statistiche proprie E degli avversari, ordinate per influenza.
+
+    Per ogni squadra 'data' è una lista di record (dict) con soli tipi Python
+    nativi (str/float/int), già pronta per la serializzazione JSON: i valori
+    arrivano da .tolist() e non serve alcuna conversione a valle.
     """
     # Statistiche proprie e avversari
     own_stats = ['PT', 'AS', 'RT', 'PR', 'ST', '3PTM']
@@ -853,66 +933,58 @@ def compute_win_vs_loss_diff_by_team(team_games):
 
     team_diffs = {}
 
-    for team in team_games['Team'].unique():
-        team_data = team_games[team_games['Team'] == team]
-        wins = team_data[team_data['Win'] == 1]
-        losses = team_data[team_data['Win'] == 0]
+    stat_cols = [c for c in own_stats + opp_stats if c in team_games.columns]
 
-        if len(wins) < 2 or len(losses) < 2:
-            continue
+    # Conteggio vittorie/sconfitte e medie per (squadra, esito) in un solo passaggio
+    counts = team_games.groupby('Team', sort=False, observed=True)['Win'].agg(['sum', 'count'])
+    n_wins = counts['sum']
+    n_losses = counts['count'] - counts['sum']
+    eligible = counts.index[(n_wins >= 2) & (n_losses >= 2)]
 
-        results = []
+    if len(eligible) == 0:
+        return team_diffs
 
-        # Statistiche proprie
-        for col in own_stats:
-            if col not in team_data.columns:
-                continue
-            win_mean = wins[col].mean()
-            loss_mean = losses[col].mean()
-            if pd.isna(win_mean) or pd.isna(loss_mean):
-                continue
-            diff = win_mean - loss_mean
-            diff_pct = (diff / loss_mean * 100) if loss_mean != 0 else 0
+    means = team_games.groupby(['Team', 'Win'], sort=False, observed=True)[stat_cols].mean()
+    win_means = means.xs(1, level='Win').reindex(eligible)
+    loss_means = means.xs(0, level='Win').reindex(eligible)
+    diff = win_means - loss_means
+    diff_pct = (diff / loss_means * 100).where(loss_means != 0, 0)
 
-            results.append({
-                'Statistica': col,
-                'Tipo': 'Noi',
-                'Media Vittorie': round(win_mean, 1),
-                'Media Sconfitte': round(loss_mean, 1),
-                'Differenza': round(diff, 1),
-                'Diff %': round(diff_pct, 1),
-                'Influenza': abs(diff_pct)  # Per ordinamento
-            })
+    # Arrotondamento di numpy (come round() su np.float64) prima di .tolist():
+    # round() su float Python darebbe risultati diversi sui valori x.x5
+    win_rounded, loss_rounded, diff_rounded, pct_rounded = (
+        values.round(1) for values in (win_means, loss_means, diff, diff_pct))
 
-        # Statistiche avversari
-        for col in opp_stats:
-            if col not in team_data.columns:
-                continue
-            win_mean = wins[col].mean()
-            loss_mean = losses[col].mean()
+    for team in eligible:
+        results = []
+
+        rows = zip(stat_cols, win_rounded.loc[team].tolist(), loss_rounded.loc[team].tolist(),
+                   diff_rounded.loc[team].tolist(), pct_rounded.loc[team].tolist(),
+                   diff_pct.loc[team].tolist())
+        for col, win_mean, loss_mean, d, d_pct, influence in rows:
             if pd.isna(win_mean) or pd.isna(loss_mean):
                 continue
-            diff = win_mean - loss_mean
-            diff_pct = (diff / loss_mean * 100) if loss_mean != 0 else 0
+            is_opp = col.startswith('OPP_')
 
             results.append({
                 'Statistica': col.replace('OPP_', ''),
-                'Tipo': 'Avversari',
-                'Media Vittorie': round(win_mean, 1),
-                'Media Sconfitte': round(loss_mean, 1),
-                'Differenza': round(diff, 1),
-                'Diff %': round(diff_pct, 1),
-                'Influenza': abs(diff_pct)
+                'Tipo': 'Avversari' if is_opp else 'Noi',
+                'Media Vittorie': win_mean,
+                'Media Sconfitte': loss_mean,
+                'Differenza': d,
+                'Diff %': d_pct,
+                'Influenza': abs(influence)  # Per ordinamento
             })
 
         # Ordina per influenza (differenza % assoluta)
         results = sorted(results, key=lambda x: x['Influenza'], reverse=True)
 
+        wins, losses = int(n_wins[team]), int(n_losses[team])
         team_diffs[team] = {
             'data': results,
-            'n_wins': len(wins),
-            'n_losses': len(losses),
-            'win_rate': round(len(wins) / len(team_data) * 100, 1)
+            'n_wins': wins,
+            'n_losses': losses,
+            'win_rate': round(wins / (wins + losses) * 100, 1)
         }
 
     return team_diffs
@@ -920,6 +992,23 @@ def compute_win_vs_loss_diff_by_team(team_games):
 
 # ========== DECISION TREE PER SQUADRA (STATISTICHE DI SQUADRA) ==========
 
+def _fit_rule_tree(dt, X, y):
+    """
+    Addestra l'albero (profondità 3) usato per le regole di vittoria.
+    Con ~30 partite per squadra il costo è dominato dalla validazione
+    dell'input di sklearn: X viene preparato già nel formato interno
+    (float32 contiguo) e la validazione viene saltata.
+    Lo stesso classificatore viene riaddestrato per ogni squadra: le regole
+    vanno estratte prima del fit successivo.
+    Restituisce False se l'addestramento fallisce.
+    """
+    try:
+        dt.fit(np.ascontiguousarray(X, dtype=np.float32), y, check_input=False)
+    except Exception:
+        return False
+    return True
+
+
 def compute_team_game_rules(team_games, min_games=10):
     """
     Per ogni squadra, trova quali STATISTICHE DI SQUADRA (nostre + avversari) predicono la vittoria.
@@ -931,26 +1020,27 @@ def compute_team_game_rules(team_games, min_games=10):
     own_features = ['PT', 'AS', 'RT', 'PR', 'ST', '3PTM']
     opp_features = ['OPP_PT', 'OPP_AS', 'OPP_RT', 'OPP_PR', 'OPP_ST', 'OPP_3PTM']
 
-    for team in team_games['Team'].unique():
-        team_data = team_games[team_games['Team'] == team].copy()
+    available_features = [f for f in own_features + opp_features if f in team_games.columns]
 
-        n_games = len(team_data)
-        if n_games < min_games:
-            continue
+    # Un solo passaggio groupby; le squadre con poche partite vengono scartate
+    # dai conteggi, senza estrarne il sotto-frame
+    grouped = team_games.groupby('Team', sort=False, observed=True)
+    games_per_team = grouped.size()
+
+    dt = DecisionTreeClassifier(max_depth=3, random_state=42, min_samples_leaf=3)
 
-        # Prepara features
-        available_features = [f for f in own_features + opp_features if f in team_data.columns]
-        X = team_data[available_features].fillna(0)
-        y = team_data['Win'].astype(int)
+    for team, n_games in games_per_team[games_per_team >= min_games].items():
+        team_data = grouped.get_group(team)
 
-        if len(y.unique()) < 2:  # Serve almeno una vittoria e una sconfitta
+        # Prepara features (ndarray: sklearn salta la validazione del DataFrame)
+        X = team_data[available_features].fillna(0).to_numpy()
+        y = team_data['Win'].to_numpy(dtype=np.int8)
+
+        if y.min() == y.max():  # Serve almeno una vittoria e una sconfitta
             continue
 
         # Train decision tree
-        dt = DecisionTreeClassifier(max_depth=3, random_state=42, min_samples_leaf=3)
-        try:
-            dt.fit(X, y)
-        except Exception:
+        if not _fit_rule_tree(dt, X, y):
             continue
 
         team_win_rate = y.mean()
@@ -968,11 +1058,38 @@ def compute_team_game_rules(team_games, min_games=10):
     return team_rules
 
 
+def _aggregate_tree(tree_):
+    """
+    Calcola per ogni nodo dell'albero (campioni, probabilità di vittoria) in un
+    solo passaggio bottom-up: i figli hanno sempre indice maggiore del padre,
+    quindi scorrendo i nodi a ritroso sono già calcolati.
+    """
+    n_nodes = tree_.node_count
+    is_leaf = tree_.feature == -2
+
+    # Foglie: valori calcolati per tutti i nodi in un colpo solo
+    values = tree_.value[:, 0, :]
+    totals = values.sum(axis=1)
+    win_prob = np.zeros(n_nodes, dtype=np.float64)
+    np.divide(values[:, 1], totals, out=win_prob, where=is_leaf & (totals > 0))
+    samples = np.where(is_leaf, tree_.n_node_samples, 0).astype(np.int64)
+
+    # Nodi interni: media pesata dei figli, a ritroso
+    for n in np.flatnonzero(~is_leaf)[::-1]:
+        left, right = tree_.children_left[n], tree_.children_right[n]
+        samples[n] = samples[left] + samples[right]
+        if samples[n] > 0:
+            win_prob[n] = (samples[left] * win_prob[left] + samples[right] * win_prob[right]) / samples[n]
+
+    return samples, win_prob
+
+
 def extract_team_stat_rules(tree, feature_names, team_win_rate):
     """
     Estrae regole con statistiche di squadra in formato COPPIA (≤ vs >).
     """
     tree_ = tree.tree_
+    node_samples, node_prob = _aggregate_tree(tree_)
 
     labels = {
         'PT': ('Punti', 'fatti'),
@@ -1005,24 +1122,8 @@ def extract_team_stat_rules(tree, feature_names, team_win_rate):
         left_node = tree_.children_left[node]
         right_node = tree_.children_right[node]
 
-        def get_leaf_stats(n):
-            if tree_.feature[n] == -2:
-                samples = tree_.n_node_samples[n]
-                value = tree_.value[n][0]
-                win_prob = value[1] / sum(value) if sum(value) > 0 else 0
-                return samples, win_prob
-            else:
-                l_samples, l_prob = get_leaf_stats(tree_.children_left[n])
-                r_samples, r_prob = get_leaf_stats(tree_.children_right[n])
-                total = l_samples + r_samples
-                if total > 0:
-                    avg_prob = (l_samples * l_prob + r_samples * r_prob) / total
-                else:
-                    avg_prob = 0
-                return total, avg_prob
-
-        left_samples, left_prob = get_leaf_stats(left_node)
-        right_samples, right_prob = get_leaf_stats(right_node)
+        left_samples, left_prob = node_samples[left_node], node_prob[left_node]
+        right_samples, right_prob = node_samples[right_node], node_prob[right_node]
 
         diff = abs(left_prob - right_prob)
 
@@ -1053,8 +1154,8 @@ def extract_team_stat_rules(tree, feature_names, team_win_rate):
 
     extract_pairs(0)
 
-    # Ordina per differenza
-    paired_rules = sorted(paired_rules, key=lambda x: x['diff'], reverse=True)[:5]
+    # Ordina per differenza (già assoluta) e tiene solo le più incisive
+    paired_rules = sorted(paired_rules, key=lambda x: x['diff'], reverse=True)[:MAX_RULES_PER_TEAM]
 
     return paired_rules
 
@@ -1068,55 +1169,53 @@ def compute_player_based_rules(overall_df, min_games=10):
     """
     team_rules = {}
 
-    for team in overall_df['Team'].unique():
-        team_data = overall_df[overall_df['Team'] == team].copy()
-
-        # Trova partite uniche
-        game_keys = team_data.groupby(['Opponent', 'Gap']).size().reset_index()[['Opponent', 'Gap']]
+    # Aggregazioni condivise calcolate una sola volta su tutto il frame,
+    # poi lette per squadra: partite uniche e minuti per giocatore
+    game_keys_df = overall_df[['Team', 'Opponent', 'Gap']].dropna().drop_duplicates()
+    games_by_team = {team: pd.MultiIndex.from_frame(keys[['Opponent', 'Gap']])
+                     for team, keys in game_keys_df.groupby('Team', sort=False, observed=True)}
+    player_minutes = overall_df.groupby(['Team', 'Giocatore'], sort=False, observed=True)['Minutes'].sum()
+    minutes_by_team = {team: mins.droplevel('Team')
+                       for team, mins in player_minutes.groupby(level='Team', sort=False, observed=True)}
+
+    team_groups = overall_df.groupby('Team', sort=False, observed=True)
+    dt = DecisionTreeClassifier(max_depth=3, random_state=42, min_samples_leaf=3)
+
+    for team in overall_df['Team'].dropna().unique():
+        # Partite uniche (nell'ordine in cui compaiono): scarto immediato
+        # delle squadre con poche partite, prima di estrarne i dati
+        game_keys = games_by_team.get(team, [])
         n_games = len(game_keys)
 
         if n_games < min_games:
             continue
 
+        team_data = team_groups.get_group(team)
+
         # Prendi i top 5 giocatori per minuti
-        player_minutes = team_data.groupby('Giocatore')['Minutes'].sum().sort_values(ascending=False)
-        top_players = player_minutes.head(5).index.tolist()
+        top_players = (minutes_by_team[team].sort_values(ascending=False, kind='stable')
+                       .head(5).index.tolist())
 
         if len(top_players) < 3:
             continue
 
-        # Pivot: una riga per partita, colonne = stats per giocatore
-        game_stats = []
-        for (opp, gap), game_df in team_data.groupby(['Opponent', 'Gap']):
-            row = {'Opponent': opp, 'Gap': gap, 'Win': 1 if gap > 0 else 0}
-            for player in top_players:
-                p_data = game_df[game_df['Giocatore'] == player]
-                if len(p_data) > 0:
-                    row[f'{player}_PT'] = p_data['PT'].sum()
-                    row[f'{player}_MIN'] = p_data['Minutes'].sum()
-                else:
-                    row[f'{player}_PT'] = 0
-                    row[f'{player}_MIN'] = 0
-            game_stats.append(row)
-
-        game_df = pd.DataFrame(game_stats)
-
-        if len(game_df) < min_games:
-            continue
+        # Pivot: una riga per partita, colonne = stats per giocatore (PT e MIN alternati)
+        top_data = team_data[team_data['Giocatore'].isin(top_players)]
+        wide = (top_data.groupby(['Opponent', 'Gap', 'Giocatore'], sort=False, observed=True)[['PT', 'Minutes']]
+                .sum().unstack('Giocatore'))
+        suffixes = {'PT': 'PT', 'Minutes': 'MIN'}
+        wide_cols = [(stat, player) for player in top_players for stat in suffixes]
+        wide = wide.reindex(index=game_keys, columns=wide_cols).fillna(0)
 
-        # Features
-        feature_cols = [c for c in game_df.columns if c.endswith('_PT') or c.endswith('_MIN')]
-        X = game_df[feature_cols].fillna(0)
-        y = game_df['Win']
+        feature_cols = [f'{player}_{suffixes[stat]}' for stat, player in wide_cols]
+        X = wide.to_numpy()
+        y = (wide.index.get_level_values('Gap').to_numpy() > 0).astype(np.int8)
 
-        if len(y.unique()) < 2:
+        if y.min() == y.max():
             continue
 
         # Decision tree
-        dt = DecisionTreeClassifier(max_depth=3, random_state=42, min_samples_leaf=3)
-        try:
-            dt.fit(X, y)
-        except Exception:
+        if not _fit_rule_tree(dt, X, y):
             continue
 
         team_win_rate = y.mean()
@@ -1140,6 +1239,7 @@ def extract_player_rules(tree, feature_names, team_win_rate):
     Estrae regole con nomi giocatori in formato COPPIA (≤ vs >).
     """
     tree_ = tree.tree_
+    node_samples, node_prob = _aggregate_tree(tree_)
 
     paired_rules = []
 
@@ -1165,24 +1265,8 @@ def extract_player_rules(tree, feature_names, team_win_rate):
         left_node = tree_.children_left[node]
         right_node = tree_.children_right[node]
 
-        def get_leaf_stats(n):
-            if tree_.feature[n] == -2:
-                samples = tree_.n_node_samples[n]
-                value = tree_.value[n][0]
-                win_prob = value[1] / sum(value) if sum(value) > 0 else 0
-                return samples, win_prob
-            else:
-                l_samples, l_prob = get_leaf_stats(tree_.children_left[n])
-                r_samples, r_prob = get_leaf_stats(tree_.children_right[n])
-                total = l_samples + r_samples
-                if total > 0:
-                    avg_prob = (l_samples * l_prob + r_samples * r_prob) / total
-                else:
-                    avg_prob = 0
-                return total, avg_prob
-
-        left_samples, left_prob = get_leaf_stats(left_node)
-        right_samples, right_prob = get_leaf_stats(right_node)
+        left_samples, left_prob = node_samples[left_node], node_prob[left_node]
+        right_samples, right_prob = node_samples[right_node], node_prob[right_node]
 
         diff = abs(left_prob - right_prob)
 
@@ -1213,8 +1297,8 @@ def extract_player_rules(tree, feature_names, team_win_rate):
 
     extract_pairs(0)
 
-    # Ordina per differenza
-    paired_rules = sorted(paired_rules, key=lambda x: x['diff'], reverse=True)[:5]
+    # Ordina per differenza (già assoluta) e tiene solo le più incisive
+    paired_rules = sorted(paired_rules, key=lambda x: x['diff'], reverse=True)[:MAX_RULES_PER_TEAM]
 
     return paired_rules
 
@@ -1230,7 +1314,7 @@ def compute_player_similarity(player_stats, n_neighbors=5, min_minutes=100):
     Include anche il profilo statistico normalizzato per visualizzazione.
     """
     # Filtra giocatori con minuti sufficienti
-    df = player_stats[player_stats['Minutes'] >= min_minutes].copy()
+    df = player_stats[player_stats['Minutes'] >= min_minutes]
 
     if len(df) < n_neighbors + 1:
         return None
@@ -1242,48 +1326,48 @@ def compute_player_similarity(player_stats, n_neighbors=5, min_minutes=100):
 
     # Normalizza
     scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    X_scaled = scaler.fit_transform(X).astype(np.float32, copy=False)
 
     # Calcola percentili per profilo visivo
-    profile_stats = ['PT', 'AS', 'RT', 'PR', 'ST']
-    profile_stats = [s for s in profile_stats if s in df.columns]
-
-    percentiles = {}
-    for stat in profile_stats:
-        vals = df[stat].values
-        for i, v in enumerate(vals):
-            pct = stats.percentileofscore(vals, v, kind='rank')
-            if i not in percentiles:
-                percentiles[i] = {}
-            percentiles[i][stat] = round(pct, 0)
+    profile_stats = [s for s in PROFILE_STATS if s in df.columns]
+
+    # Un rank vettoriale per statistica (equivalente a percentileofscore kind='rank'):
+    # matrice giocatori x statistiche, i profili sono indicizzati per posizione
+    pct_matrix = np.empty((len(df), len(profile_stats)), dtype=np.float32)
+    for j, stat in enumerate(profile_stats):
+        pct_matrix[:, j] = _percentile_rank(df[stat], df[stat]).round(0)
+    # Percentili interi: un solo cast vettoriale invece di int() per valore
+    profiles = [dict(zip(profile_stats, row)) for row in pct_matrix.astype(np.int32).tolist()]
 
     # Nearest Neighbors
-    nn = NearestNeighbors(n_neighbors=n_neighbors + 1, metric='cosine')
+    nn = NearestNeighbors(n_neighbors=n_neighbors + 1, metric='cosine', algorithm='brute')
     nn.fit(X_scaled)
 
     distances, indices = nn.kneighbors(X_scaled)
 
-    # Costruisci risultati
+    # Costruisci risultati (accesso posizionale su array, non tramite .iloc)
+    names = df['Giocatore'].to_numpy()
+    teams = df['Team'].to_numpy()
+
     results = []
-    for i, row in df.reset_index(drop=True).iterrows():
+    for i, (name, team) in enumerate(zip(names, teams)):
         # Profilo del giocatore corrente
-        player_profile = percentiles.get(i, {})
+        player_profile = profiles[i]
 
         similar_players = []
-        for j, (dist, idx) in enumerate(zip(distances[i][1:], indices[i][1:])):  # Skip self
-            similar_row = df.iloc[idx]
-            similar_profile = percentiles.get(idx, {})
+        for dist, idx in zip(distances[i, 1:].tolist(), indices[i, 1:].tolist()):  # Skip self
+            similar_profile = profiles[idx]
 
             similar_players.append({
-                'name': similar_row['Giocatore'],
-                'team': similar_row['Team'],
+                'name': names[idx],
+                'team': teams[idx],
                 'similarity': 1 - dist,
                 'profile': similar_profile
             })
 
         results.append({
-            'Giocatore': row['Giocatore'],
-            'Team': row['Team'],
+            'Giocatore': name,
+            'Team': team,
             'profile': player_profile,
             'similar': similar_players
         })
@@ -1291,152 +1375,215 @@ def compute_player_similarity(player_stats, n_neighbors=5, min_minutes=100):
     return results
 
 
-def generate_advanced_report(overall_df, player_stats, campionato):
+def _fig_html(fig):
     """
-    Genera un report HTML con tutte le analisi avanzate.
+    HTML del grafico da incorporare nel report. La figura è già validata
+    quando viene costruita, quindi la serializzazione salta la seconda validazione.
     """
-    import json
+    return pio.to_html(fig, full_html=False, include_plotlyjs=False, validate=False)
 
-    # Calcola numero partite per giocatore da overall_df
-    player_stats = player_stats.copy()
-    game_counts = overall_df.groupby(['Giocatore', 'Team']).size().reset_index(name='Partite')
-    player_stats = player_stats.merge(game_counts, on=['Giocatore', 'Team'], how='left')
-    player_stats['Partite'] = player_stats['Partite'].fillna(1)  # fallback
 
-    # Calcola medie per partita per radar giocatori
-    for stat in ['PT', 'AS', 'RT', 'PR', 'ST']:
-        if stat in player_stats.columns:
-            player_stats[f'{stat}_pergame'] = player_stats[stat] / player_stats['Partite']
+def _json_default(obj):
+    """Converte scalari e array numpy nei tipi Python equivalenti."""
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    raise TypeError(f'Tipo non serializzabile: {type(obj).__name__}')
 
-    # True shooting % (se non già presente)
-    if 'True_shooting' not in player_stats.columns:
-        if '2PTA' in player_stats.columns and '3PTA' in player_stats.columns and 'FTA' in player_stats.columns:
-            tsa = player_stats['2PTA'] + player_stats['3PTA'] + 0.44 * player_stats['FTA']
-            player_stats['True_shooting'] = np.where(tsa > 0, player_stats['PT'] / (2 * tsa), 0)
 
-    # Calcola tutte le metriche
-    consistency_df = compute_consistency_metrics(overall_df)
-    form_df = compute_recent_form(overall_df)
-    ha_df = compute_home_away_splits(overall_df)
-    dep_df = compute_team_dependency(overall_df, player_stats)
-    team_stats = compute_team_stats(overall_df)
-    shot_df = compute_shot_distribution(player_stats)
+def _js_dumps(obj):
+    """
+    Serializza i dati incorporati nel report come letterale JavaScript.
+    Usa orjson (encoder in C) se disponibile, altrimenti json; gli scalari
+    numpy vengono serializzati direttamente, senza conversioni a monte.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    return json.dumps(obj, default=_json_default)
 
-    # Nuove analisi a livello squadra
-    team_games = compute_team_game_stats(overall_df)
-    team_win_loss_diffs = compute_win_vs_loss_diff_by_team(team_games)
-    team_rules_stats = compute_team_game_rules(team_games)  # Statistiche di squadra
-    team_rules_players = compute_player_based_rules(overall_df)  # Performance giocatori
-    similarity_data = compute_player_similarity(player_stats)
 
-    # Prepara HTML
-    html = f'''<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>Analisi Avanzate - {campionato}</title>
-    <link rel="icon" type="image/png" href="../static/favicon180x180.png">
+# Chiavi brevi per le righe ripetute nei dati incorporati nel report
+# (meno byte da scrivere e da analizzare nel browser)
+_RULE_JS_KEYS = {
+    'condition': 'c', 'threshold': 't', 'stat': 's', 'diff': 'd',
+    'left_prob': 'lp', 'left_samples': 'ls', 'right_prob': 'rp', 'right_samples': 'rs',
+}
+_WIN_LOSS_JS_KEYS = {'Media Vittorie': 'mv', 'Media Sconfitte': 'ms', 'Differenza': 'd', 'Diff %': 'dp'}
+
+
+def _compact(row, keys):
+    """Riga con le sole chiavi usate dal JS, rinominate in forma breve."""
+    return {short: row[key] for key, short in keys.items()}
+
+
+def _profile_color_index(pct):
+    """Indice in PROFILE_COLORS per un percentile (soglie 80/60/40/20)."""
+    if pct >= 80:
+        return 0  # Top tier
+    if pct >= 60:
+        return 1  # Good
+    if pct >= 40:
+        return 2  # Average
+    if pct >= 20:
+        return 3  # Below avg
+    return 4      # Low
+
+
+def _rules_payload(data):
+    """
+    Regole di una squadra per il JS: righe a chiavi brevi, win rate in
+    percentuale e, per le regole sui giocatori, i top players.
+    """
+    payload = {
+        'rules': [_compact(rule, _RULE_JS_KEYS) for rule in data['rules']],
+        'n_games': data['n_games'],
+        'win_rate': round(float(data['win_rate']) * 100, 1)
+    }
+    if 'top_players' in data:
+        payload['top_players'] = data['top_players']
+    return payload
+
+
+def _win_loss_payload(data):
+    """
+    Dati win/loss di una squadra per il JS: righe raggruppate per statistica
+    (fatte + subite), ordinate per influenza massima, e valore massimo
+    per normalizzare le barre.
+    """
+    groups = {}
+    for row in data['data']:
+        group = groups.setdefault(row['Statistica'], {'stat': row['Statistica'], 'fatte': None, 'subite': None, 'influenza': 0})
+        group['fatte' if row['Tipo'] == 'Noi' else 'subite'] = _compact(row, _WIN_LOSS_JS_KEYS)
+        group['influenza'] = max(group['influenza'], row['Influenza'])
+
+    sorted_stats = sorted(groups.values(), key=lambda g: g['influenza'], reverse=True)
+    max_value = max((max(r['Media Vittorie'], r['Media Sconfitte']) for r in data['data']), default=0)
+
+    return {
+        'sorted_stats': [{'stat': g['stat'], 'fatte': g['fatte'], 'subite': g['subite']} for g in sorted_stats],
+        'max_value': max_value,
+        'n_wins': data['n_wins'],
+        'n_losses': data['n_losses'],
+        'win_rate': data['win_rate']
+    }
+
+
+def _radar_normalize(df, stat_cols, real_decimals):
+    """
+    Normalizzazione 0-max (0-100) per i radar: restituisce le matrici
+    (valori normalizzati, valori reali) con una riga per riga di df.
+    I valori mancanti valgono 0.
+    """
+    values = np.nan_to_num(df[stat_cols].to_numpy(dtype=np.float64))
+    max_vals = values.max(axis=0) if len(values) else np.zeros(len(stat_cols))
+    safe_max = np.where(max_vals > 0, max_vals, 1.0)
+    norm = np.where(max_vals > 0, values / safe_max * 100, 0.0)
+    return norm.round(1), values.round(real_decimals)
+
+
+# Parte statica dell'intestazione del report (stili e logo): costante di modulo,
+# non viene ricostruita a ogni chiamata come blocco di un f-string
+_REPORT_HEAD_HTML = '''    <link rel="icon" type="image/png" href="../static/favicon180x180.png">
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&family=Roboto:wght@400;500&display=swap" rel="stylesheet">
     <script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
     <style>
-        :root {{
+        :root {
             --tp-primary: #00F95B;
             --tp-secondary: #302B8F;
             --tp-dark: #18205E;
-        }}
-        * {{ box-sizing: border-box; }}
-        body {{
+        }
+        * { box-sizing: border-box; }
+        body {
             font-family: 'Roboto', sans-serif;
             max-width: 1600px;
             margin: 0 auto;
             padding: 20px;
             background: #f5f5f5;
-        }}
-        h1 {{
+        }
+        h1 {
             font-family: 'Poppins', sans-serif;
             color: var(--tp-secondary);
             text-align: center;
-        }}
-        h2 {{
+        }
+        h2 {
             font-family: 'Poppins', sans-serif;
             color: var(--tp-secondary);
             border-bottom: 3px solid var(--tp-primary);
             padding-bottom: 8px;
             margin-top: 40px;
-        }}
-        .header-logo {{
+        }
+        .header-logo {
             display: flex;
             justify-content: center;
             margin-bottom: 10px;
-        }}
-        .header-logo img {{
+        }
+        .header-logo img {
             height: 50px;
-        }}
-        .section {{
+        }
+        .section {
             background: white;
             border-radius: 8px;
             padding: 20px;
             margin-bottom: 20px;
             box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        .section-desc {{
+        }
+        .section-desc {
             color: #666;
             margin-bottom: 20px;
             font-size: 14px;
-        }}
-        .radar-selector {{
+        }
+        .radar-selector {
             background: #f9f9f9;
             padding: 15px;
             border-radius: 8px;
             margin-bottom: 20px;
-        }}
-        .radar-selector label {{
+        }
+        .radar-selector label {
             font-weight: bold;
             color: var(--tp-secondary);
-        }}
-        .radar-selector select {{
+        }
+        .radar-selector select {
             padding: 8px 12px;
             border: 1px solid #ccc;
             border-radius: 4px;
             font-size: 14px;
             margin: 0 10px;
-        }}
-        .radar-selector button {{
+        }
+        .radar-selector button {
             padding: 8px 16px;
             background: var(--tp-secondary);
             color: white;
             border: none;
             border-radius: 4px;
             cursor: pointer;
-        }}
-        .radar-selector button:hover {{
+        }
+        .radar-selector button:hover {
             background: var(--tp-dark);
-        }}
-        .consistency-legend {{
+        }
+        .consistency-legend {
             display: flex;
             gap: 20px;
             margin-bottom: 15px;
             font-size: 13px;
-        }}
-        .consistency-legend span {{
+        }
+        .consistency-legend span {
             display: flex;
             align-items: center;
             gap: 5px;
-        }}
-        .legend-dot {{
+        }
+        .legend-dot {
             width: 12px;
             height: 12px;
             border-radius: 50%;
-        }}
-        .tab-container {{
+        }
+        .tab-container {
             display: flex;
             gap: 5px;
             margin-bottom: 15px;
             flex-wrap: wrap;
-        }}
-        .tab-btn {{
+        }
+        .tab-btn {
             padding: 8px 16px;
             border: 2px solid var(--tp-secondary);
             background: white;
@@ -1444,185 +1591,649 @@ def generate_advanced_report(overall_df, player_stats, campionato):
             border-radius: 4px;
             cursor: pointer;
             font-weight: 500;
-        }}
-        .tab-btn:hover {{
+        }
+        .tab-btn:hover {
             background: #f0f0f0;
-        }}
-        .tab-btn.active {{
+        }
+        .tab-btn.active {
             background: var(--tp-secondary);
             color: white;
-        }}
-        .tab-content {{
+        }
+        .tab-content {
             display: none;
-        }}
-        .tab-content.active {{
+        }
+        .tab-content.active {
             display: block;
-        }}
-        .two-col {{
+        }
+        .two-col {
             display: grid;
             grid-template-columns: 1fr 1fr;
             gap: 20px;
-        }}
-        @media (max-width: 900px) {{
-            .two-col {{
+        }
+        @media (max-width: 900px) {
+            .two-col {
                 grid-template-columns: 1fr;
-            }}
-        }}
+            }
+        }
     </style>
 </head>
 <body>
     <div class="header-logo">
         <img src="../static/twinplay_one_row.svg" alt="TwinPlay">
     </div>
-    <h1>Analisi Avanzate - {campionato}</h1>
 '''
 
-    # Ordina giocatori per squadra e poi per minuti
-    sorted_players = player_stats.sort_values(['Team', 'Minutes'], ascending=[True, False])
-    sorted_teams = sorted(team_stats['Team'].unique())
 
-    # ========== 1. RADAR CHART GIOCATORI ==========
-    html += '''
-    <h2>1. Radar Chart - Confronto Giocatori</h2>
-    <div class="section">
-        <p class="section-desc">
-            Confronta il profilo statistico di più giocatori. I valori sono normalizzati (0-100)
-            dove 100 = massimo del campionato. Passa il mouse per vedere i valori reali (per partita).
-        </p>
-        <div class="radar-selector">
-            <label>Seleziona giocatori:</label>
-            <select id="player1">
-'''
+# Funzioni JavaScript del report: indipendenti dai dati, restano fuori dall'f-string
+# (niente graffe raddoppiate); per chiamata si formattano solo le costanti con i dati
+_REPORT_SCRIPT_JS = '''        // Categorie con il poligono già chiuso (il primo vertice ripetuto in coda)
+        const playerCategoriesClosed = [...playerCategories, playerCategories[0]];
+        const teamCategoriesClosed = [...teamCategories, teamCategories[0]];
+        const profileLabels = {'PT': 'Punti', 'AS': 'Assist', 'RT': 'Rimb', 'PR': 'Recup', 'ST': 'Stopp'};
 
-    current_team = None
-    for _, row in sorted_players.iterrows():
-        if row['Team'] != current_team:
-            if current_team is not None:
-                html += '                </optgroup>\n'
-            current_team = row['Team']
-            html += f'                <optgroup label="{current_team}">\n'
-        html += f'                    <option value="{row["Giocatore"]}">{row["Giocatore"]}</option>\n'
-    html += '                </optgroup>\n'
-
-    html += '''
-            </select>
-            <select id="player2">
-'''
-    current_team = None
-    for _, row in sorted_players.iterrows():
-        if row['Team'] != current_team:
-            if current_team is not None:
-                html += '                </optgroup>\n'
-            current_team = row['Team']
-            html += f'                <optgroup label="{current_team}">\n'
-        html += f'                    <option value="{row["Giocatore"]}">{row["Giocatore"]}</option>\n'
-    html += '                </optgroup>\n'
-
-    html += '''
-            </select>
-            <button onclick="updatePlayerRadar()">Confronta</button>
-        </div>
-        <div id="player-radar-chart"></div>
-    </div>
-'''
+        function updatePlayerRadar() {
+            const p1 = document.getElementById('player1').value;
+            const p2 = document.getElementById('player2').value;
 
-    # Prepara dati per radar chart giocatori (0-max normalization)
-    # Prima calcola max per ogni statistica
-    player_stat_max = {}
-    for stat_col, stat_name in RADAR_STATS:
-        if stat_col in player_stats.columns:
-            vals = player_stats[stat_col].dropna()
-            player_stat_max[stat_col] = vals.max()
-
-    radar_data = {}
-    for _, row in player_stats.iterrows():
-        norm_values = []
-        real_values = []
-        for stat_col, _ in RADAR_STATS:
-            if stat_col in player_stats.columns:
-                val = row[stat_col]
-                if pd.isna(val):
-                    norm_values.append(0)
-                    real_values.append(0)
-                else:
-                    # 0-max normalization (0-100)
-                    max_v = player_stat_max[stat_col]
-                    if max_v > 0:
-                        norm = val / max_v * 100
-                    else:
-                        norm = 0
-                    norm_values.append(round(norm, 1))
-                    real_values.append(round(val, 3))
-        radar_data[row['Giocatore']] = {
-            'values': norm_values,
-            'real': real_values,
-            'team': row['Team']
-        }
+            const data = [];
+            const colors = ['#302B8F', '#00F95B'];
 
-    # ========== 2. RADAR CHART SQUADRE ==========
-    html += '''
-    <h2>2. Radar Chart - Confronto Squadre</h2>
-    <div class="section">
-        <p class="section-desc">
-            Confronta il profilo delle squadre. I valori sono normalizzati (0-100)
-            dove 100 = massimo del campionato. Passa il mouse per vedere i valori reali.
-        </p>
-        <div class="radar-selector">
-            <label>Seleziona squadre:</label>
-            <select id="team1">
-'''
-    for team in sorted_teams:
-        html += f'                <option value="{team}">{team}</option>\n'
+            [p1, p2].forEach((player, i) => {
+                if (playerRadarData[player]) {
+                    const vals = [...playerRadarData[player].values];
+                    const realVals = playerRadarData[player].real;
 
-    html += '''
-            </select>
-            <select id="team2">
-'''
-    for i, team in enumerate(sorted_teams):
-        selected = ' selected' if i == 1 else ''
-        html += f'                <option value="{team}"{selected}>{team}</option>\n'
+                    // Crea testo hover con valori reali
+                    const hoverText = playerCategories.map((cat, idx) => {
+                        const real = realVals[idx] || 0;
+                        if (cat.includes('Efficienza')) {
+                            return cat + ': ' + (real * 100).toFixed(1) + '%';
+                        } else {
+                            return cat + ': ' + real.toFixed(1) + '/partita';
+                        }
+                    });
 
-    html += '''
-            </select>
-            <button onclick="updateTeamRadar()">Confronta</button>
-        </div>
-        <div id="team-radar-chart"></div>
-    </div>
-'''
+                    // Chiudi il poligono
+                    vals.push(vals[0]);
+                    hoverText.push(hoverText[0]);
 
-    # Prepara dati per radar chart squadre (0-max normalization)
-    team_stat_max = {}
-    for stat_col, stat_name in TEAM_RADAR_STATS:
-        if stat_col in team_stats.columns:
-            vals = team_stats[stat_col].dropna()
-            team_stat_max[stat_col] = vals.max()
-
-    team_radar_data = {}
-    for _, row in team_stats.iterrows():
-        norm_values = []
-        real_values = []
-        for stat_col, _ in TEAM_RADAR_STATS:
-            if stat_col in team_stats.columns:
-                val = row[stat_col]
-                if pd.isna(val):
-                    norm_values.append(0)
-                    real_values.append(0)
-                else:
-                    max_v = team_stat_max[stat_col]
-                    if max_v > 0:
-                        norm = val / max_v * 100
-                    else:
-                        norm = 0
-                    norm_values.append(round(norm, 1))
-                    real_values.append(round(val, 1))
-        team_radar_data[row['Team']] = {
-            'values': norm_values,
-            'real': real_values
+                    data.push({
+                        type: 'scatterpolar',
+                        r: vals,
+                        theta: playerCategoriesClosed,
+                        fill: 'toself',
+                        fillcolor: colors[i] + '33',
+                        line: { color: colors[i], width: 2 },
+                        name: player + ' (' + playerRadarData[player].team + ')',
+                        text: hoverText,
+                        hoverinfo: 'text+name'
+                    });
+                }
+            });
+
+            const layout = {
+                polar: {
+                    radialaxis: {
+                        visible: true,
+                        range: [0, 100],
+                        tickvals: [0, 25, 50, 75, 100],
+                        ticktext: ['0', '25', '50', '75', '100']
+                    }
+                },
+                showlegend: true,
+                legend: { orientation: 'h', y: -0.2 },
+                height: 500,
+                margin: { t: 50 }
+            };
+
+            Plotly.react('player-radar-chart', data, layout);
         }
 
-    # ========== 3. FORMA RECENTE ==========
-    html += '''
-    <h2>3. Forma Recente - Chi è Hot/Cold</h2>
+        function updateTeamRadar() {
+            const t1 = document.getElementById('team1').value;
+            const t2 = document.getElementById('team2').value;
+
+            const data = [];
+            const colors = ['#302B8F', '#00F95B'];
+
+            [t1, t2].forEach((team, i) => {
+                if (teamRadarData[team]) {
+                    const vals = [...teamRadarData[team].values];
+                    const realVals = teamRadarData[team].real;
+
+                    // Crea testo hover con valori reali
+                    const hoverText = teamCategories.map((cat, idx) => {
+                        const real = realVals[idx] || 0;
+                        if (cat.includes('Tiro')) {
+                            return cat + ': ' + real.toFixed(1) + '%';
+                        } else {
+                            return cat + ': ' + real.toFixed(1) + '/partita';
+                        }
+                    });
+
+                    // Chiudi il poligono
+                    vals.push(vals[0]);
+                    hoverText.push(hoverText[0]);
+
+                    data.push({
+                        type: 'scatterpolar',
+                        r: vals,
+                        theta: teamCategoriesClosed,
+                        fill: 'toself',
+                        fillcolor: colors[i] + '33',
+                        line: { color: colors[i], width: 2 },
+                        name: team,
+                        text: hoverText,
+                        hoverinfo: 'text+name'
+                    });
+                }
+            });
+
+            const layout = {
+                polar: {
+                    radialaxis: {
+                        visible: true,
+                        range: [0, 100],
+                        tickvals: [0, 25, 50, 75, 100],
+                        ticktext: ['0', '25', '50', '75', '100']
+                    }
+                },
+                showlegend: true,
+                legend: { orientation: 'h', y: -0.2 },
+                height: 500,
+                margin: { t: 50 }
+            };
+
+            Plotly.react('team-radar-chart', data, layout);
+        }
+
+        function showTab(prefix, tab, btn) {
+            document.querySelectorAll('[id^="' + prefix + '-"]').forEach(el => el.classList.remove('active'));
+            document.querySelectorAll('.tab-btn').forEach(el => {
+                if (el.closest('.section') === btn.closest('.section')) {
+                    el.classList.remove('active');
+                }
+            });
+            const tabEl = document.getElementById(prefix + '-' + tab);
+            tabEl.classList.add('active');
+            btn.classList.add('active');
+
+            // Forza Plotly a ricalcolare le dimensioni
+            setTimeout(() => {
+                window.dispatchEvent(new Event('resize'));
+            }, 50);
+        }
+
+        // Contenuto già generato per giocatore/squadra: riselezionare non lo ricostruisce
+        const similarCache = new Map();
+        const teamRulesCache = new Map();
+        const winLossCache = new Map();
+
+        function showSimilarPlayers() {
+            const player = document.getElementById('similarity-player').value;
+            const resultsDiv = document.getElementById('similarity-results');
+
+            if (similarCache.has(player)) {
+                resultsDiv.innerHTML = similarCache.get(player);
+                return;
+            }
+
+            if (!similarityData[player]) {
+                resultsDiv.innerHTML = '<p style="color: #666; padding: 15px;">Giocatore non trovato o minuti insufficienti.</p>';
+                return;
+            }
+
+            const data = similarityData[player];
+
+            // Funzione per creare mini profilo visivo
+            function createMiniProfile(profile, colors) {
+                const cells = ['<div style="display: flex; gap: 4px; justify-content: center;">'];
+                profileStats.forEach((stat, i) => {
+                    const pct = profile[stat] || 0;
+                    // Colore basato su percentile (fascia calcolata lato Python)
+                    const color = profileColors[colors[i]];
+
+                    cells.push(
+                        `<div style="display: flex; flex-direction: column; align-items: center; min-width: 32px;" title="${profileLabels[stat]}: ${pct}° percentile">`,
+                        `<div style="font-size: 9px; color: #999; margin-bottom: 2px;">${profileLabels[stat]}</div>`,
+                        `<div style="width: 24px; height: 24px; border-radius: 4px; background: ${color}; display: flex; align-items: center; justify-content: center; font-size: 10px; font-weight: bold; color: white;">${pct}</div>`,
+                        `</div>`
+                    );
+                });
+                cells.push('</div>');
+                return cells.join('');
+            }
+
+            const parts = ['<div style="margin-top: 15px;">'];
+
+            // Prima mostra il profilo del giocatore selezionato
+            parts.push(
+                `<div style="background: var(--tp-secondary); color: white; padding: 15px; border-radius: 8px; margin-bottom: 15px;">`,
+                `<div style="font-weight: bold; margin-bottom: 10px;">📊 Profilo di ${player} (${data.team})</div>`,
+                `<div style="display: flex; gap: 8px; justify-content: center;">`
+            );
+            profileStats.forEach(stat => {
+                const pct = data.profile[stat] || 0;
+                parts.push(
+                    `<div style="text-align: center; min-width: 50px;">`,
+                    `<div style="font-size: 11px; opacity: 0.8;">${profileLabels[stat]}</div>`,
+                    `<div style="font-size: 20px; font-weight: bold;">${pct}</div>`,
+                    `<div style="font-size: 10px; opacity: 0.7;">percentile</div>`,
+                    `</div>`
+                );
+            });
+            parts.push(
+                `</div></div>`,
+                // Lista giocatori simili
+                '<div style="display: flex; flex-direction: column; gap: 10px;">'
+            );
+
+            data.similar.forEach((sim, i) => {
+                const simPercent = (sim.similarity * 100).toFixed(0);
+                const barWidth = sim.similarity * 100;
+
+                parts.push(
+                    `<div style="background: white; border: 1px solid #e5e5e5; border-radius: 8px; padding: 12px; display: grid; grid-template-columns: 1fr auto 180px; align-items: center; gap: 15px;">`,
+                    // Nome e squadra
+                    `<div>`,
+                    `<div style="font-weight: 600;">${sim.name}</div>`,
+                    `<div style="font-size: 12px; color: #666;">${sim.team}</div>`,
+                    `</div>`,
+                    // Profilo visivo
+                    createMiniProfile(sim.profile, sim.profile_colors),
+                    // Similarità
+                    `<div style="display: flex; align-items: center; gap: 8px;">`,
+                    `<div style="flex: 1; background: #e5e5e5; border-radius: 4px; height: 8px; width: 80px;">`,
+                    `<div style="width: ${barWidth}%; background: var(--tp-primary); height: 100%; border-radius: 4px;"></div>`,
+                    `</div>`,
+                    `<span style="font-weight: bold; min-width: 45px;">${simPercent}%</span>`,
+                    `</div>`,
+                    `</div>`
+                );
+            });
+
+            parts.push('</div></div>');
+            const html = parts.join('');
+            similarCache.set(player, html);
+            resultsDiv.innerHTML = html;
+        }
+
+        // Crea un elemento con stile inline e testo (senza passare dal parser HTML)
+        function createEl(tag, css, text) {
+            const node = document.createElement(tag);
+            if (css) node.style.cssText = css;
+            if (text !== undefined) node.textContent = text;
+            return node;
+        }
+
+        // Riquadro di una delle due condizioni di una regola (≤ / >)
+        function createRuleSide(label, prob, samples, better) {
+            const box = createEl('div', `background: ${better ? '#dcfce7' : '#fee2e2'}; padding: 12px; border-radius: 6px; text-align: center;`);
+            box.append(
+                createEl('div', 'font-size: 13px; color: #666;', label),
+                createEl('div', `font-size: 24px; font-weight: bold; color: ${better ? '#22c55e' : '#ef4444'};`, `${prob}%`),
+                createEl('div', 'font-size: 12px; color: #666;', `(${samples} partite)`)
+            );
+            return box;
+        }
+
+        function createRuleCard(rule) {
+            const leftProb = (rule.lp * 100).toFixed(0);
+            const rightProb = (rule.rp * 100).toFixed(0);
+            const diffPct = (rule.d * 100).toFixed(0);
+
+            // Colori basati su quale è meglio
+            const leftBetter = rule.lp > rule.rp;
+
+            // Titolo condizione con stat se presente
+            let conditionTitle = rule.c;
+            if (rule.s) {
+                conditionTitle += ` (${rule.s})`;
+            }
+
+            const card = createEl('div', 'background: white; border: 1px solid #e5e5e5; border-radius: 8px; padding: 15px; box-shadow: 0 1px 3px rgba(0,0,0,0.1);');
+
+            // Header con nome condizione
+            const header = createEl('div', 'font-weight: bold; margin-bottom: 12px; font-size: 15px; color: var(--tp-secondary); display: flex; align-items: center; gap: 8px; flex-wrap: wrap;');
+            header.append(
+                createEl('span', '', conditionTitle),
+                createEl('span', 'font-size: 13px; color: #666; margin-left: auto;', `Δ ${diffPct}%`)
+            );
+
+            // Due condizioni affiancate
+            const leftLabel = rule.s ? `≤ ${rule.t} ${rule.s}` : `≤ ${rule.t}`;
+            const rightLabel = rule.s ? `> ${rule.t} ${rule.s}` : `> ${rule.t}`;
+            const cols = createEl('div', 'display: grid; grid-template-columns: 1fr 1fr; gap: 10px;');
+            cols.append(
+                createRuleSide(leftLabel, leftProb, rule.ls, leftBetter),
+                createRuleSide(rightLabel, rightProb, rule.rs, !leftBetter)
+            );
+
+            card.append(header, cols);
+            return card;
+        }
+
+        function showTeamRules() {
+            const team = document.getElementById('team-rules-select').value;
+            const ruleType = document.getElementById('rules-type-select').value;
+            const contentDiv = document.getElementById('team-rules-content');
+
+            const cacheKey = ruleType + '|' + team;
+            if (teamRulesCache.has(cacheKey)) {
+                contentDiv.replaceChildren(teamRulesCache.get(cacheKey));
+                return;
+            }
+
+            // Seleziona il dataset giusto
+            const dataSource = ruleType === 'stats' ? teamRulesStatsData : teamRulesPlayersData;
+
+            if (!dataSource[team]) {
+                const otherSource = ruleType === 'stats' ? teamRulesPlayersData : teamRulesStatsData;
+                if (otherSource[team]) {
+                    contentDiv.innerHTML = `<p style="color: #666; padding: 15px;">Nessuna regola "${ruleType === 'stats' ? 'statistiche squadra' : 'giocatori'}" per questa squadra. Prova l'altra modalità.</p>`;
+                } else {
+                    contentDiv.innerHTML = '<p style="color: #666; padding: 15px;">Nessuna regola trovata per questa squadra.</p>';
+                }
+                return;
+            }
+
+            const data = dataSource[team];
+            const root = createEl('div', 'margin-top: 15px;');
+
+            // Riepilogo (per giocatori, anche i top players)
+            let summary = `<strong>${data.n_games} partite</strong> | Win rate: <strong>${data.win_rate}%</strong>`;
+            if (ruleType === 'players' && data.top_players && data.top_players.length > 0) {
+                summary += ` | Top 5: <span style="color: #666;">${data.top_players.join(', ')}</span>`;
+            }
+            const summaryEl = createEl('p', 'margin-bottom: 15px;');
+            summaryEl.innerHTML = summary;
+            root.appendChild(summaryEl);
+
+            if (data.rules && data.rules.length > 0) {
+                // Le card vengono costruite come nodi in un fragment e inserite con un solo append
+                const list = createEl('div', 'display: flex; flex-direction: column; gap: 15px;');
+                const frag = document.createDocumentFragment();
+                data.rules.forEach(rule => frag.appendChild(createRuleCard(rule)));
+                list.appendChild(frag);
+                root.appendChild(list);
+            } else {
+                root.appendChild(createEl('p', '', 'Nessuna regola significativa trovata (differenza minima tra condizioni).'));
+            }
+
+            teamRulesCache.set(cacheKey, root);
+            contentDiv.replaceChildren(root);
+        }
+
+        function showWinLossDiff() {
+            const team = document.getElementById('winloss-team-select').value;
+            const contentDiv = document.getElementById('winloss-content');
+
+            if (winLossCache.has(team)) {
+                contentDiv.innerHTML = winLossCache.get(team);
+                return;
+            }
+
+            if (!winLossData[team]) {
+                contentDiv.innerHTML = '<p style="color: #666; padding: 15px;">Dati insufficienti per questa squadra.</p>';
+                return;
+            }
+
+            const data = winLossData[team];
+            const labels = {
+                'PT': 'Punti', 'AS': 'Assist', 'RT': 'Rimbalzi', 'PR': 'Recuperi',
+                'ST': 'Stoppate', '3PTM': 'Triple', '2PT_%': '% da 2', '3PT_%': '% da 3'
+            };
+
+            // Statistiche già raggruppate e ordinate per influenza lato Python
+            const maxValue = data.max_value;
+
+            const parts = ['<div style="margin-top: 15px;">'];
+            parts.push(`<p style="margin-bottom: 15px;">
+                <span style="color: #22c55e; font-weight: bold;">●</span> <strong>${data.n_wins} vittorie</strong>
+                vs
+                <span style="color: #ef4444; font-weight: bold;">●</span> <strong>${data.n_losses} sconfitte</strong>
+                (Win rate: ${data.win_rate}%)
+            </p>`);
+
+            parts.push('<div style="display: flex; flex-direction: column; gap: 16px;">');
+
+            data.sorted_stats.forEach(group => {
+                const label = labels[group.stat] || group.stat;
+
+                parts.push(
+                    `<div style="background: white; border: 1px solid #e5e5e5; border-radius: 8px; padding: 16px;">`,
+                    // Titolo statistica
+                    `<div style="text-align: center; margin-bottom: 12px;">`,
+                    `<span style="font-weight: 700; color: var(--tp-secondary); font-size: 16px;">${label}</span>`,
+                    `</div>`,
+                    // Due colonne: fatte | subite
+                    `<div style="display: grid; grid-template-columns: 1fr 1fr; gap: 16px;">`
+                );
+
+                // Helper per creare una colonna
+                function createColumn(rowData, tipo, tipoColor) {
+                    if (!rowData) {
+                        return `<div style="background: #f9f9f9; border-radius: 8px; padding: 12px; text-align: center; color: #999;">N/D</div>`;
+                    }
+
+                    const winVal = rowData.mv;
+                    const lossVal = rowData.ms;
+                    const diffPct = rowData.dp;
+                    const diffAbs = rowData.d;
+                    const diffSign = diffPct > 0 ? '+' : '';
+                    const diffAbsSign = diffAbs > 0 ? '+' : '';
+
+                    const winWidth = (winVal / maxValue) * 100;
+                    const lossWidth = (lossVal / maxValue) * 100;
+
+                    // Verde se positivo per fatte, verde se negativo per subite
+                    const isPositive = tipo === 'fatte' ? diffPct > 0 : diffPct < 0;
+                    const diffColor = isPositive ? '#22c55e' : '#ef4444';
+
+                    return [
+                        `<div style="background: #f9f9f9; border-radius: 8px; padding: 12px;">`,
+                        // Header: tipo + variazione
+                        `<div style="text-align: center; margin-bottom: 10px;">`,
+                        `<span style="background: ${tipoColor}; color: white; padding: 3px 10px; border-radius: 12px; font-size: 12px; font-weight: 600;">${tipo}</span>`,
+                        `<div style="margin-top: 6px;">`,
+                        `<span style="font-size: 20px; font-weight: bold; color: ${diffColor};">${diffSign}${diffPct}%</span>`,
+                        `<span style="font-size: 13px; color: #666; margin-left: 6px;">(${diffAbsSign}${diffAbs})</span>`,
+                        `</div></div>`,
+                        // Barre
+                        `<div style="display: flex; flex-direction: column; gap: 4px;">`,
+                        // Vittorie
+                        `<div style="display: flex; align-items: center; gap: 6px;">`,
+                        `<div style="width: 16px; font-size: 10px; color: #22c55e; font-weight: bold;">V</div>`,
+                        `<div style="flex: 1; background: #e5e5e5; border-radius: 3px; height: 18px; position: relative; overflow: hidden;">`,
+                        `<div style="width: ${winWidth}%; background: #22c55e; height: 100%; border-radius: 3px;"></div>`,
+                        `<span style="position: absolute; left: 6px; top: 50%; transform: translateY(-50%); font-size: 11px; font-weight: 600; color: #166534;">${winVal}</span>`,
+                        `</div></div>`,
+                        // Sconfitte
+                        `<div style="display: flex; align-items: center; gap: 6px;">`,
+                        `<div style="width: 16px; font-size: 10px; color: #ef4444; font-weight: bold;">S</div>`,
+                        `<div style="flex: 1; background: #e5e5e5; border-radius: 3px; height: 18px; position: relative; overflow: hidden;">`,
+                        `<div style="width: ${lossWidth}%; background: #ef4444; height: 100%; border-radius: 3px;"></div>`,
+                        `<span style="position: absolute; left: 6px; top: 50%; transform: translateY(-50%); font-size: 11px; font-weight: 600; color: #991b1b;">${lossVal}</span>`,
+                        `</div></div>`,
+                        `</div></div>`
+                    ].join('');
+                }
+
+                // Colonna FATTE (sinistra)
+                parts.push(
+                    createColumn(group.fatte, 'fatte', '#302B8F'),
+                    // Colonna SUBITE (destra)
+                    createColumn(group.subite, 'subite', '#f97316'),
+                    `</div></div>`
+                );
+            });
+
+            parts.push('</div></div>');
+            const html = parts.join('');
+            winLossCache.set(team, html);
+            contentDiv.innerHTML = html;
+        }
+
+        // Inizializza
+        updatePlayerRadar();
+        updateTeamRadar();
+        if (document.getElementById('team-rules-select')) {
+            showTeamRules();
+        }
+        if (document.getElementById('winloss-team-select')) {
+            showWinLossDiff();
+        }
+    </script>
+</body>
+</html>
+'''
+
+
+def iter_advanced_report(overall_df, player_stats, campionato):
+    """
+    Genera il report HTML con tutte le analisi avanzate, un blocco alla volta
+    (intestazione, sezioni, dati e funzioni JavaScript).
+    """
+    overall_df = prepare_overall_df(overall_df)
+
+    # Calcola numero partite per giocatore da overall_df
+    # (join sull'indice Giocatore/Team: nessuna copia preventiva né merge)
+    partite_series = overall_df.groupby(['Giocatore', 'Team'], sort=False, observed=True).size().rename('Partite')
+    player_stats = player_stats.join(partite_series, on=['Giocatore', 'Team'])
+    player_stats['Partite'] = player_stats['Partite'].fillna(1).astype(np.int32)  # fallback
+
+    # Calcola medie per partita per radar giocatori (una sola divisione matriciale)
+    pergame_stats = [s for s in ['PT', 'AS', 'RT', 'PR', 'ST'] if s in player_stats.columns]
+    partite = player_stats['Partite'].to_numpy(dtype=np.float64)
+    player_stats[[f'{s}_pergame' for s in pergame_stats]] = (
+        player_stats[pergame_stats].to_numpy(dtype=np.float64) / partite[:, None])
+
+    # True shooting % (se non già presente)
+    if 'True_shooting' not in player_stats.columns:
+        if '2PTA' in player_stats.columns and '3PTA' in player_stats.columns and 'FTA' in player_stats.columns:
+            pt, p2a, p3a, fta = (player_stats[c].to_numpy(dtype=np.float64) for c in ('PT', '2PTA', '3PTA', 'FTA'))
+            tsa = p2a + p3a + 0.44 * fta
+            ts = np.zeros_like(tsa)
+            np.divide(pt, 2 * tsa, out=ts, where=tsa > 0)
+            player_stats['True_shooting'] = ts
+
+    # Calcola tutte le metriche
+    consistency_df = compute_consistency_metrics(overall_df)
+    form_df = compute_recent_form(overall_df)
+    ha_df = compute_home_away_splits(overall_df)
+    dep_df = compute_team_dependency(overall_df, player_stats)
+    team_stats = compute_team_stats(overall_df)
+    shot_df = compute_shot_distribution(player_stats)
+
+    # Nuove analisi a livello squadra
+    team_games = compute_team_game_stats(overall_df)
+    team_win_loss_diffs = compute_win_vs_loss_diff_by_team(team_games)
+    team_rules_stats = compute_team_game_rules(team_games)  # Statistiche di squadra
+    team_rules_players = compute_player_based_rules(overall_df)  # Performance giocatori
+    similarity_data = compute_player_similarity(player_stats)
+
+    # HTML
+    yield f'''<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Analisi Avanzate - {campionato}</title>
+'''
+    yield _REPORT_HEAD_HTML
+    yield f'    <h1>Analisi Avanzate - {campionato}</h1>\n'
+
+    # Ordina giocatori per squadra e poi per minuti
+    sorted_players = player_stats.sort_values(['Team', 'Minutes'], ascending=[True, False])
+    sorted_teams = sorted(team_stats['Team'].unique())
+
+    # Opzioni giocatori raggruppate per squadra: generate una volta, usate da tutte le select
+    option_parts = []
+    for team, names in sorted_players.groupby('Team', sort=False, observed=True)['Giocatore']:
+        option_parts.append(f'                <optgroup label="{team}">\n')
+        option_parts.extend(f'                    <option value="{name}">{name}</option>\n' for name in names)
+        option_parts.append('                </optgroup>\n')
+    player_options = ''.join(option_parts)
+
+    # ========== 1. RADAR CHART GIOCATORI ==========
+    yield '''
+    <h2>1. Radar Chart - Confronto Giocatori</h2>
+    <div class="section">
+        <p class="section-desc">
+            Confronta il profilo statistico di più giocatori. I valori sono normalizzati (0-100)
+            dove 100 = massimo del campionato. Passa il mouse per vedere i valori reali (per partita).
+        </p>
+        <div class="radar-selector">
+            <label>Seleziona giocatori:</label>
+            <select id="player1">
+'''
+
+    yield player_options
+
+    yield '''
+            </select>
+            <select id="player2">
+'''
+    yield player_options
+
+    yield '''
+            </select>
+            <button onclick="updatePlayerRadar()">Confronta</button>
+        </div>
+        <div id="player-radar-chart"></div>
+    </div>
+'''
+
+    # Prepara dati per radar chart giocatori (0-max normalization)
+    radar_cols = [stat_col for stat_col, _ in RADAR_STATS if stat_col in player_stats.columns]
+    norm, real = _radar_normalize(player_stats, radar_cols, real_decimals=3)
+    radar_data = {
+        name: {'values': norm_row, 'real': real_row, 'team': team}
+        for name, team, norm_row, real_row in zip(player_stats['Giocatore'].tolist(), player_stats['Team'].tolist(),
+                                                  norm.tolist(), real.tolist())
+    }
+
+    # ========== 2. RADAR CHART SQUADRE ==========
+    yield '''
+    <h2>2. Radar Chart - Confronto Squadre</h2>
+    <div class="section">
+        <p class="section-desc">
+            Confronta il profilo delle squadre. I valori sono normalizzati (0-100)
+            dove 100 = massimo del campionato. Passa il mouse per vedere i valori reali.
+        </p>
+        <div class="radar-selector">
+            <label>Seleziona squadre:</label>
+            <select id="team1">
+'''
+    for team in sorted_teams:
+        yield f'                <option value="{team}">{team}</option>\n'
+
+    yield '''
+            </select>
+            <select id="team2">
+'''
+    for i, team in enumerate(sorted_teams):
+        selected = ' selected' if i == 1 else ''
+        yield f'                <option value="{team}"{selected}>{team}</option>\n'
+
+    yield '''
+            </select>
+            <button onclick="updateTeamRadar()">Confronta</button>
+        </div>
+        <div id="team-radar-chart"></div>
+    </div>
+'''
+
+    # Prepara dati per radar chart squadre (0-max normalization)
+    team_radar_cols = [stat_col for stat_col, _ in TEAM_RADAR_STATS if stat_col in team_stats.columns]
+    norm, real = _radar_normalize(team_stats, team_radar_cols, real_decimals=1)
+    team_radar_data = {
+        team: {'values': norm_row, 'real': real_row}
+        for team, norm_row, real_row in zip(team_stats['Team'].tolist(), norm.tolist(), real.tolist())
+    }
+
+    # ========== 3. FORMA RECENTE ==========
+    yield '''
+    <h2>3. Forma Recente - Chi è Hot/Cold</h2>
     <div class="section">
         <p class="section-desc">
             Confronto tra le <strong>ultime 5 partite</strong> e la media stagionale.
@@ -1631,13 +2242,13 @@ def generate_advanced_report(overall_df, player_stats, campionato):
 '''
     form_fig = create_form_chart(form_df, 'PT', top_n=20)
     if form_fig:
-        html += f'        {form_fig.to_html(full_html=False, include_plotlyjs=False)}\n'
+        yield f'        {_fig_html(form_fig)}\n'
     else:
-        html += '        <p>Dati insufficienti.</p>\n'
-    html += '    </div>\n'
+        yield '        <p>Dati insufficienti.</p>\n'
+    yield '    </div>\n'
 
     # ========== 4. HOME VS AWAY ==========
-    html += '''
+    yield '''
     <h2>4. Casa vs Trasferta</h2>
     <div class="section">
         <p class="section-desc">
@@ -1648,13 +2259,13 @@ def generate_advanced_report(overall_df, player_stats, campionato):
 '''
     ha_fig = create_home_away_chart(ha_df, 'PT', top_n=25)
     if ha_fig:
-        html += f'        {ha_fig.to_html(full_html=False, include_plotlyjs=False)}\n'
+        yield f'        {_fig_html(ha_fig)}\n'
     else:
-        html += '        <p>Dati insufficienti (servono almeno 3 partite casa e 3 trasferta).</p>\n'
-    html += '    </div>\n'
+        yield '        <p>Dati insufficienti (servono almeno 3 partite casa e 3 trasferta).</p>\n'
+    yield '    </div>\n'
 
     # ========== 5. DIPENDENZA SQUADRA ==========
-    html += '''
+    yield '''
     <h2>5. Dipendenza Squadra</h2>
     <div class="section">
         <p class="section-desc">
@@ -1668,26 +2279,26 @@ def generate_advanced_report(overall_df, player_stats, campionato):
 '''
     # Grafico punti
     dep_pt_fig = create_dependency_chart(dep_df, 'PT')
-    html += '        <div id="dep-pt" class="tab-content active">\n'
+    yield '        <div id="dep-pt" class="tab-content active">\n'
     if dep_pt_fig:
-        html += f'            {dep_pt_fig.to_html(full_html=False, include_plotlyjs=False)}\n'
+        yield f'            {_fig_html(dep_pt_fig)}\n'
     else:
-        html += '            <p>Dati insufficienti.</p>\n'
-    html += '        </div>\n'
+        yield '            <p>Dati insufficienti.</p>\n'
+    yield '        </div>\n'
 
     # Grafico minuti
     dep_min_fig = create_dependency_chart(dep_df, 'MIN')
-    html += '        <div id="dep-min" class="tab-content">\n'
+    yield '        <div id="dep-min" class="tab-content">\n'
     if dep_min_fig:
-        html += f'            {dep_min_fig.to_html(full_html=False, include_plotlyjs=False)}\n'
+        yield f'            {_fig_html(dep_min_fig)}\n'
     else:
-        html += '            <p>Dati insufficienti.</p>\n'
-    html += '        </div>\n'
+        yield '            <p>Dati insufficienti.</p>\n'
+    yield '        </div>\n'
 
-    html += '    </div>\n'
+    yield '    </div>\n'
 
     # ========== 6. SHOT DISTRIBUTION ==========
-    html += '''
+    yield '''
     <h2>6. Distribuzione Tiri</h2>
     <div class="section">
         <p class="section-desc">
@@ -1702,35 +2313,35 @@ def generate_advanced_report(overall_df, player_stats, campionato):
 '''
     # Grafico 3PT
     shot_3pt = create_shot_chart(shot_df, '3PT', min_att=15, top_n=40)
-    html += '        <div id="shot-3pt" class="tab-content active">\n'
+    yield '        <div id="shot-3pt" class="tab-content active">\n'
     if shot_3pt:
-        html += f'            {shot_3pt.to_html(full_html=False, include_plotlyjs=False)}\n'
+        yield f'            {_fig_html(shot_3pt)}\n'
     else:
-        html += '            <p>Dati insufficienti.</p>\n'
-    html += '        </div>\n'
+        yield '            <p>Dati insufficienti.</p>\n'
+    yield '        </div>\n'
 
     # Grafico 2PT
     shot_2pt = create_shot_chart(shot_df, '2PT', min_att=20, top_n=40)
-    html += '        <div id="shot-2pt" class="tab-content">\n'
+    yield '        <div id="shot-2pt" class="tab-content">\n'
     if shot_2pt:
-        html += f'            {shot_2pt.to_html(full_html=False, include_plotlyjs=False)}\n'
+        yield f'            {_fig_html(shot_2pt)}\n'
     else:
-        html += '            <p>Dati insufficienti.</p>\n'
-    html += '        </div>\n'
+        yield '            <p>Dati insufficienti.</p>\n'
+    yield '        </div>\n'
 
     # Grafico FT
     shot_ft = create_shot_chart(shot_df, 'FT', min_att=15, top_n=40)
-    html += '        <div id="shot-ft" class="tab-content">\n'
+    yield '        <div id="shot-ft" class="tab-content">\n'
     if shot_ft:
-        html += f'            {shot_ft.to_html(full_html=False, include_plotlyjs=False)}\n'
+        yield f'            {_fig_html(shot_ft)}\n'
     else:
-        html += '            <p>Dati insufficienti.</p>\n'
-    html += '        </div>\n'
+        yield '            <p>Dati insufficienti.</p>\n'
+    yield '        </div>\n'
 
-    html += '    </div>\n'
+    yield '    </div>\n'
 
     # ========== 7. CONSISTENZA ==========
-    html += '''
+    yield '''
     <h2>7. Consistenza - Giocatori Affidabili</h2>
     <div class="section">
         <p class="section-desc">
@@ -1754,14 +2365,14 @@ def generate_advanced_report(overall_df, player_stats, campionato):
         consistency_fig = create_consistency_plot(consistency_df, stat_col, stat_name, top_n=25)
         active = ' active' if stat_id == 'pt' else ''
         if consistency_fig:
-            html += f'        <div id="cons-{stat_id}" class="tab-content{active}">\n'
-            html += f'            {consistency_fig.to_html(full_html=False, include_plotlyjs=False)}\n'
-            html += '        </div>\n'
+            yield f'        <div id="cons-{stat_id}" class="tab-content{active}">\n'
+            yield f'            {_fig_html(consistency_fig)}\n'
+            yield '        </div>\n'
 
-    html += '    </div>\n'
+    yield '    </div>\n'
 
     # ========== 8. VITTORIE VS SCONFITTE PER SQUADRA ==========
-    html += '''
+    yield '''
     <h2>8. Vittorie vs Sconfitte per Squadra</h2>
     <div class="section">
         <p class="section-desc">
@@ -1771,24 +2382,24 @@ def generate_advanced_report(overall_df, player_stats, campionato):
         </p>
 '''
     if team_win_loss_diffs:
-        html += '''
+        yield '''
         <div class="radar-selector">
             <label>Seleziona squadra:</label>
             <select id="winloss-team-select" onchange="showWinLossDiff()">
 '''
         for team in sorted(team_win_loss_diffs.keys()):
-            html += f'                <option value="{team}">{team}</option>\n'
-        html += '''
+            yield f'                <option value="{team}">{team}</option>\n'
+        yield '''
             </select>
         </div>
         <div id="winloss-content"></div>
 '''
     else:
-        html += '        <p>Dati insufficienti.</p>\n'
-    html += '    </div>\n'
+        yield '        <p>Dati insufficienti.</p>\n'
+    yield '    </div>\n'
 
     # ========== 9. REGOLE PER SQUADRA ==========
-    html += '''
+    yield '''
     <h2>9. Quando Vince Ogni Squadra</h2>
     <div class="section">
         <p class="section-desc">
@@ -1802,7 +2413,7 @@ def generate_advanced_report(overall_df, player_stats, campionato):
     all_teams = set(team_rules_stats.keys()) | set(team_rules_players.keys())
 
     if all_teams:
-        html += '''
+        yield '''
         <div class="radar-selector" style="display: flex; flex-wrap: wrap; gap: 15px; align-items: center;">
             <div>
                 <label>Tipo analisi:</label>
@@ -1816,20 +2427,20 @@ def generate_advanced_report(overall_df, player_stats, campionato):
                 <select id="team-rules-select" onchange="showTeamRules()">
 '''
         for team in sorted(all_teams):
-            html += f'                <option value="{team}">{team}</option>\n'
-        html += '''
+            yield f'                <option value="{team}">{team}</option>\n'
+        yield '''
                 </select>
             </div>
         </div>
         <div id="team-rules-content"></div>
 '''
     else:
-        html += '        <p>Dati insufficienti (servono almeno 10 partite per squadra).</p>\n'
+        yield '        <p>Dati insufficienti (servono almeno 10 partite per squadra).</p>\n'
 
-    html += '    </div>\n'
+    yield '    </div>\n'
 
     # ========== 10. SIMILARITÀ GIOCATORI ==========
-    html += '''
+    yield '''
     <h2>10. Giocatori Simili</h2>
     <div class="section">
         <p class="section-desc">
@@ -1840,16 +2451,8 @@ def generate_advanced_report(overall_df, player_stats, campionato):
             <label>Seleziona giocatore:</label>
             <select id="similarity-player">
 '''
-    current_team = None
-    for _, row in sorted_players.iterrows():
-        if row['Team'] != current_team:
-            if current_team is not None:
-                html += '                </optgroup>\n'
-            current_team = row['Team']
-            html += f'                <optgroup label="{current_team}">\n'
-        html += f'                    <option value="{row["Giocatore"]}">{row["Giocatore"]}</option>\n'
-    html += '                </optgroup>\n'
-    html += '''
+    yield player_options
+    yield '''
             </select>
             <button onclick="showSimilarPlayers()">Trova Simili</button>
         </div>
@@ -1857,556 +2460,76 @@ def generate_advanced_report(overall_df, player_stats, campionato):
     </div>
 '''
 
-    # Prepara dati similarità per JavaScript (con profilo)
-    similarity_js = {}
-    if similarity_data:
-        for item in similarity_data:
-            # Converti profili in dict con int
-            player_profile = {k: int(v) for k, v in item.get('profile', {}).items()}
-            similar_clean = []
-            for s in item['similar']:
-                s_profile = {k: int(v) for k, v in s.get('profile', {}).items()}
-                similar_clean.append({
-                    'name': s['name'],
-                    'team': s['team'],
-                    'similarity': float(s['similarity']),
-                    'profile': s_profile
-                })
-            similarity_js[item['Giocatore']] = {
-                'team': item['Team'],
-                'profile': player_profile,
-                'similar': similar_clean
-            }
-
-    # Prepara dati team rules STATISTICHE per JavaScript
-    team_rules_stats_js = {}
-    for team, data in team_rules_stats.items():
-        rules_clean = []
-        for rule in data['rules']:
-            rules_clean.append({
-                'condition': rule['condition'],
-                'threshold': int(rule['threshold']),
-                'stat': rule.get('stat', ''),
-                'who': rule.get('who', 'Noi'),
-                'left_prob': float(rule['left_prob']),
-                'left_samples': int(rule['left_samples']),
-                'right_prob': float(rule['right_prob']),
-                'right_samples': int(rule['right_samples']),
-                'diff': float(rule['diff'])
-            })
-        team_rules_stats_js[team] = {
-            'rules': rules_clean,
-            'n_games': int(data['n_games']),
-            'win_rate': round(float(data['win_rate']) * 100, 1)
+    # Prepara dati per JavaScript: nessuna conversione dei valori (gli scalari
+    # numpy li gestisce l'encoder), le righe ripetute usano chiavi brevi
+    similarity_js = {
+        item['Giocatore']: {
+            'team': item['Team'],
+            'profile': item.get('profile', {}),
+            # Colori del mini profilo già calcolati (indici in PROFILE_COLORS,
+            # nell'ordine di PROFILE_STATS): il JS non li ricava a ogni selezione
+            'similar': [
+                {**sim, 'profile_colors': [_profile_color_index(sim['profile'].get(stat, 0)) for stat in PROFILE_STATS]}
+                for sim in item['similar']
+            ]
         }
+        for item in similarity_data or []
+    }
 
-    # Prepara dati team rules GIOCATORI per JavaScript
-    team_rules_players_js = {}
-    for team, data in team_rules_players.items():
-        rules_clean = []
-        for rule in data['rules']:
-            rules_clean.append({
-                'condition': rule['condition'],
-                'threshold': int(rule['threshold']),
-                'stat': rule.get('stat', ''),
-                'player': rule.get('player', ''),
-                'left_prob': float(rule['left_prob']),
-                'left_samples': int(rule['left_samples']),
-                'right_prob': float(rule['right_prob']),
-                'right_samples': int(rule['right_samples']),
-                'diff': float(rule['diff'])
-            })
-        team_rules_players_js[team] = {
-            'rules': rules_clean,
-            'n_games': int(data['n_games']),
-            'win_rate': round(float(data['win_rate']) * 100, 1),
-            'top_players': data.get('top_players', [])
-        }
+    # Team rules (statistiche di squadra / giocatori)
+    team_rules_stats_js = {team: _rules_payload(data) for team, data in team_rules_stats.items()}
+    team_rules_players_js = {team: _rules_payload(data) for team, data in team_rules_players.items()}
 
-    # Prepara dati win/loss diff per JavaScript
-    win_loss_js = {}
-    for team, data in team_win_loss_diffs.items():
-        win_loss_js[team] = {
-            'data': data['data'],
-            'n_wins': int(data['n_wins']),
-            'n_losses': int(data['n_losses']),
-            'win_rate': float(data['win_rate'])
-        }
+    # Win/loss diff (raggruppamento e ordinamento già fatti lato Python)
+    win_loss_js = {team: _win_loss_payload(data) for team, data in team_win_loss_diffs.items()}
 
     # JavaScript
-    html += f'''
+    yield f'''
     <script>
-        const playerRadarData = {json.dumps(radar_data)};
-        const similarityData = {json.dumps(similarity_js)};
-        const teamRulesStatsData = {json.dumps(team_rules_stats_js)};
-        const teamRulesPlayersData = {json.dumps(team_rules_players_js)};
-        const winLossData = {json.dumps(win_loss_js)};
-        const teamRadarData = {json.dumps(team_radar_data)};
-        const playerCategories = {json.dumps([name for _, name in RADAR_STATS])};
-        const teamCategories = {json.dumps([name for _, name in TEAM_RADAR_STATS])};
-        const profileStats = ['PT', 'AS', 'RT', 'PR', 'ST'];
-        const profileLabels = {{'PT': 'Punti', 'AS': 'Assist', 'RT': 'Rimb', 'PR': 'Recup', 'ST': 'Stopp'}};
-
-        function updatePlayerRadar() {{
-            const p1 = document.getElementById('player1').value;
-            const p2 = document.getElementById('player2').value;
-
-            const data = [];
-            const colors = ['#302B8F', '#00F95B'];
-
-            [p1, p2].forEach((player, i) => {{
-                if (playerRadarData[player]) {{
-                    const vals = [...playerRadarData[player].values];
-                    const realVals = [...playerRadarData[player].real];
-                    const cats = [...playerCategories];
-
-                    // Crea testo hover con valori reali
-                    const hoverText = cats.map((cat, idx) => {{
-                        const real = realVals[idx] || 0;
-                        if (cat.includes('Efficienza')) {{
-                            return cat + ': ' + (real * 100).toFixed(1) + '%';
-                        }} else {{
-                            return cat + ': ' + real.toFixed(1) + '/partita';
-                        }}
-                    }});
-
-                    // Chiudi il poligono
-                    vals.push(vals[0]);
-                    cats.push(cats[0]);
-                    hoverText.push(hoverText[0]);
-
-                    data.push({{
-                        type: 'scatterpolar',
-                        r: vals,
-                        theta: cats,
-                        fill: 'toself',
-                        fillcolor: colors[i] + '33',
-                        line: {{ color: colors[i], width: 2 }},
-                        name: player + ' (' + playerRadarData[player].team + ')',
-                        text: hoverText,
-                        hoverinfo: 'text+name'
-                    }});
-                }}
-            }});
-
-            const layout = {{
-                polar: {{
-                    radialaxis: {{
-                        visible: true,
-                        range: [0, 100],
-                        tickvals: [0, 25, 50, 75, 100],
-                        ticktext: ['0', '25', '50', '75', '100']
-                    }}
-                }},
-                showlegend: true,
-                legend: {{ orientation: 'h', y: -0.2 }},
-                height: 500,
-                margin: {{ t: 50 }}
-            }};
-
-            Plotly.newPlot('player-radar-chart', data, layout);
-        }}
-
-        function updateTeamRadar() {{
-            const t1 = document.getElementById('team1').value;
-            const t2 = document.getElementById('team2').value;
-
-            const data = [];
-            const colors = ['#302B8F', '#00F95B'];
-
-            [t1, t2].forEach((team, i) => {{
-                if (teamRadarData[team]) {{
-                    const vals = [...teamRadarData[team].values];
-                    const realVals = [...teamRadarData[team].real];
-                    const cats = [...teamCategories];
-
-                    // Crea testo hover con valori reali
-                    const hoverText = cats.map((cat, idx) => {{
-                        const real = realVals[idx] || 0;
-                        if (cat.includes('Tiro')) {{
-                            return cat + ': ' + real.toFixed(1) + '%';
-                        }} else {{
-                            return cat + ': ' + real.toFixed(1) + '/partita';
-                        }}
-                    }});
-
-                    // Chiudi il poligono
-                    vals.push(vals[0]);
-                    cats.push(cats[0]);
-                    hoverText.push(hoverText[0]);
-
-                    data.push({{
-                        type: 'scatterpolar',
-                        r: vals,
-                        theta: cats,
-                        fill: 'toself',
-                        fillcolor: colors[i] + '33',
-                        line: {{ color: colors[i], width: 2 }},
-                        name: team,
-                        text: hoverText,
-                        hoverinfo: 'text+name'
-                    }});
-                }}
-            }});
-
-            const layout = {{
-                polar: {{
-                    radialaxis: {{
-                        visible: true,
-                        range: [0, 100],
-                        tickvals: [0, 25, 50, 75, 100],
-                        ticktext: ['0', '25', '50', '75', '100']
-                    }}
-                }},
-                showlegend: true,
-                legend: {{ orientation: 'h', y: -0.2 }},
-                height: 500,
-                margin: {{ t: 50 }}
-            }};
-
-            Plotly.newPlot('team-radar-chart', data, layout);
-        }}
-
-        function showTab(prefix, tab, btn) {{
-            document.querySelectorAll('[id^="' + prefix + '-"]').forEach(el => el.classList.remove('active'));
-            document.querySelectorAll('.tab-btn').forEach(el => {{
-                if (el.closest('.section') === btn.closest('.section')) {{
-                    el.classList.remove('active');
-                }}
-            }});
-            const tabEl = document.getElementById(prefix + '-' + tab);
-            tabEl.classList.add('active');
-            btn.classList.add('active');
-
-            // Forza Plotly a ricalcolare le dimensioni
-            setTimeout(() => {{
-                window.dispatchEvent(new Event('resize'));
-            }}, 50);
-        }}
-
-        function showSimilarPlayers() {{
-            const player = document.getElementById('similarity-player').value;
-            const resultsDiv = document.getElementById('similarity-results');
-
-            if (!similarityData[player]) {{
-                resultsDiv.innerHTML = '<p style="color: #666; padding: 15px;">Giocatore non trovato o minuti insufficienti.</p>';
-                return;
-            }}
-
-            const data = similarityData[player];
-
-            // Funzione per creare mini profilo visivo
-            function createMiniProfile(profile) {{
-                let html = '<div style="display: flex; gap: 4px; justify-content: center;">';
-                profileStats.forEach(stat => {{
-                    const pct = profile[stat] || 0;
-                    // Colore basato su percentile
-                    let color;
-                    if (pct >= 80) color = '#22c55e';      // Top tier
-                    else if (pct >= 60) color = '#84cc16'; // Good
-                    else if (pct >= 40) color = '#eab308'; // Average
-                    else if (pct >= 20) color = '#f97316'; // Below avg
-                    else color = '#ef4444';                 // Low
-
-                    html += `<div style="display: flex; flex-direction: column; align-items: center; min-width: 32px;" title="${{profileLabels[stat]}}: ${{pct}}° percentile">`;
-                    html += `<div style="font-size: 9px; color: #999; margin-bottom: 2px;">${{profileLabels[stat]}}</div>`;
-                    html += `<div style="width: 24px; height: 24px; border-radius: 4px; background: ${{color}}; display: flex; align-items: center; justify-content: center; font-size: 10px; font-weight: bold; color: white;">${{pct}}</div>`;
-                    html += `</div>`;
-                }});
-                html += '</div>';
-                return html;
-            }}
-
-            let html = '<div style="margin-top: 15px;">';
-
-            // Prima mostra il profilo del giocatore selezionato
-            html += `<div style="background: var(--tp-secondary); color: white; padding: 15px; border-radius: 8px; margin-bottom: 15px;">`;
-            html += `<div style="font-weight: bold; margin-bottom: 10px;">📊 Profilo di ${{player}} (${{data.team}})</div>`;
-            html += `<div style="display: flex; gap: 8px; justify-content: center;">`;
-            profileStats.forEach(stat => {{
-                const pct = data.profile[stat] || 0;
-                html += `<div style="text-align: center; min-width: 50px;">`;
-                html += `<div style="font-size: 11px; opacity: 0.8;">${{profileLabels[stat]}}</div>`;
-                html += `<div style="font-size: 20px; font-weight: bold;">${{pct}}</div>`;
-                html += `<div style="font-size: 10px; opacity: 0.7;">percentile</div>`;
-                html += `</div>`;
-            }});
-            html += `</div></div>`;
-
-            // Lista giocatori simili
-            html += '<div style="display: flex; flex-direction: column; gap: 10px;">';
-
-            data.similar.forEach((sim, i) => {{
-                const simPercent = (sim.similarity * 100).toFixed(0);
-                const barWidth = sim.similarity * 100;
-
-                html += `<div style="background: white; border: 1px solid #e5e5e5; border-radius: 8px; padding: 12px; display: grid; grid-template-columns: 1fr auto 180px; align-items: center; gap: 15px;">`;
-
-                // Nome e squadra
-                html += `<div>`;
-                html += `<div style="font-weight: 600;">${{sim.name}}</div>`;
-                html += `<div style="font-size: 12px; color: #666;">${{sim.team}}</div>`;
-                html += `</div>`;
-
-                // Profilo visivo
-                html += createMiniProfile(sim.profile);
-
-                // Similarità
-                html += `<div style="display: flex; align-items: center; gap: 8px;">`;
-                html += `<div style="flex: 1; background: #e5e5e5; border-radius: 4px; height: 8px; width: 80px;">`;
-                html += `<div style="width: ${{barWidth}}%; background: var(--tp-primary); height: 100%; border-radius: 4px;"></div>`;
-                html += `</div>`;
-                html += `<span style="font-weight: bold; min-width: 45px;">${{simPercent}}%</span>`;
-                html += `</div>`;
-
-                html += `</div>`;
-            }});
-
-            html += '</div></div>';
-            resultsDiv.innerHTML = html;
-        }}
-
-        function showTeamRules() {{
-            const team = document.getElementById('team-rules-select').value;
-            const ruleType = document.getElementById('rules-type-select').value;
-            const contentDiv = document.getElementById('team-rules-content');
-
-            // Seleziona il dataset giusto
-            const dataSource = ruleType === 'stats' ? teamRulesStatsData : teamRulesPlayersData;
-
-            if (!dataSource[team]) {{
-                const otherSource = ruleType === 'stats' ? teamRulesPlayersData : teamRulesStatsData;
-                if (otherSource[team]) {{
-                    contentDiv.innerHTML = `<p style="color: #666; padding: 15px;">Nessuna regola "${{ruleType === 'stats' ? 'statistiche squadra' : 'giocatori'}}" per questa squadra. Prova l'altra modalità.</p>`;
-                }} else {{
-                    contentDiv.innerHTML = '<p style="color: #666; padding: 15px;">Nessuna regola trovata per questa squadra.</p>';
-                }}
-                return;
-            }}
-
-            const data = dataSource[team];
-            let html = '<div style="margin-top: 15px;">';
-            html += `<p style="margin-bottom: 15px;"><strong>${{data.n_games}} partite</strong> | Win rate: <strong>${{data.win_rate}}%</strong>`;
-
-            // Per giocatori, mostra i top players
-            if (ruleType === 'players' && data.top_players && data.top_players.length > 0) {{
-                html += ` | Top 5: <span style="color: #666;">${{data.top_players.join(', ')}}</span>`;
-            }}
-            html += `</p>`;
-
-            if (data.rules && data.rules.length > 0) {{
-                html += '<div style="display: flex; flex-direction: column; gap: 15px;">';
-
-                data.rules.forEach(rule => {{
-                    const leftProb = (rule.left_prob * 100).toFixed(0);
-                    const rightProb = (rule.right_prob * 100).toFixed(0);
-                    const diffPct = (rule.diff * 100).toFixed(0);
-
-                    // Colori basati su quale è meglio
-                    const leftBetter = rule.left_prob > rule.right_prob;
-                    const leftColor = leftBetter ? '#22c55e' : '#ef4444';
-                    const rightColor = leftBetter ? '#ef4444' : '#22c55e';
-
-                    // Titolo condizione con stat se presente
-                    let conditionTitle = rule.condition;
-                    if (rule.stat) {{
-                        conditionTitle += ` (${{rule.stat}})`;
-                    }}
-
-                    html += `<div style="background: white; border: 1px solid #e5e5e5; border-radius: 8px; padding: 15px; box-shadow: 0 1px 3px rgba(0,0,0,0.1);">`;
-
-                    // Header con nome condizione
-                    html += `<div style="font-weight: bold; margin-bottom: 12px; font-size: 15px; color: var(--tp-secondary); display: flex; align-items: center; gap: 8px; flex-wrap: wrap;">`;
-                    html += `<span>${{conditionTitle}}</span>`;
-                    html += `<span style="font-size: 13px; color: #666; margin-left: auto;">Δ ${{diffPct}}%</span>`;
-                    html += `</div>`;
-
-                    // Due condizioni affiancate
-                    html += `<div style="display: grid; grid-template-columns: 1fr 1fr; gap: 10px;">`;
-
-                    // Condizione ≤
-                    const leftLabel = rule.stat ? `≤ ${{rule.threshold}} ${{rule.stat}}` : `≤ ${{rule.threshold}}`;
-                    html += `<div style="background: ${{leftBetter ? '#dcfce7' : '#fee2e2'}}; padding: 12px; border-radius: 6px; text-align: center;">`;
-                    html += `<div style="font-size: 13px; color: #666;">${{leftLabel}}</div>`;
-                    html += `<div style="font-size: 24px; font-weight: bold; color: ${{leftColor}};">${{leftProb}}%</div>`;
-                    html += `<div style="font-size: 12px; color: #666;">(${{rule.left_samples}} partite)</div>`;
-                    html += `</div>`;
-
-                    // Condizione >
-                    const rightLabel = rule.stat ? `> ${{rule.threshold}} ${{rule.stat}}` : `> ${{rule.threshold}}`;
-                    html += `<div style="background: ${{!leftBetter ? '#dcfce7' : '#fee2e2'}}; padding: 12px; border-radius: 6px; text-align: center;">`;
-                    html += `<div style="font-size: 13px; color: #666;">${{rightLabel}}</div>`;
-                    html += `<div style="font-size: 24px; font-weight: bold; color: ${{rightColor}};">${{rightProb}}%</div>`;
-                    html += `<div style="font-size: 12px; color: #666;">(${{rule.right_samples}} partite)</div>`;
-                    html += `</div>`;
-
-                    html += `</div></div>`;
-                }});
-
-                html += '</div>';
-            }} else {{
-                html += '<p>Nessuna regola significativa trovata (differenza minima tra condizioni).</p>';
-            }}
-
-            html += '</div>';
-            contentDiv.innerHTML = html;
-        }}
-
-        function showWinLossDiff() {{
-            const team = document.getElementById('winloss-team-select').value;
-            const contentDiv = document.getElementById('winloss-content');
-
-            if (!winLossData[team]) {{
-                contentDiv.innerHTML = '<p style="color: #666; padding: 15px;">Dati insufficienti per questa squadra.</p>';
-                return;
-            }}
-
-            const data = winLossData[team];
-            const labels = {{
-                'PT': 'Punti', 'AS': 'Assist', 'RT': 'Rimbalzi', 'PR': 'Recuperi',
-                'ST': 'Stoppate', '3PTM': 'Triple', '2PT_%': '% da 2', '3PT_%': '% da 3'
-            }};
-
-            // Raggruppa per statistica (fatte + subite insieme)
-            const statGroups = {{}};
-            data.data.forEach(row => {{
-                const stat = row['Statistica'];
-                if (!statGroups[stat]) {{
-                    statGroups[stat] = {{ fatte: null, subite: null, maxInfluenza: 0 }};
-                }}
-                if (row['Tipo'] === 'Noi') {{
-                    statGroups[stat].fatte = row;
-                }} else {{
-                    statGroups[stat].subite = row;
-                }}
-                statGroups[stat].maxInfluenza = Math.max(statGroups[stat].maxInfluenza, row['Influenza']);
-            }});
-
-            // Ordina per influenza massima
-            const sortedStats = Object.entries(statGroups)
-                .sort((a, b) => b[1].maxInfluenza - a[1].maxInfluenza);
-
-            // Trova max per normalizzare le barre
-            const allValues = data.data.flatMap(r => [r['Media Vittorie'], r['Media Sconfitte']]);
-            const maxValue = Math.max(...allValues);
-
-            let html = '<div style="margin-top: 15px;">';
-            html += `<p style="margin-bottom: 15px;">
-                <span style="color: #22c55e; font-weight: bold;">●</span> <strong>${{data.n_wins}} vittorie</strong>
-                vs
-                <span style="color: #ef4444; font-weight: bold;">●</span> <strong>${{data.n_losses}} sconfitte</strong>
-                (Win rate: ${{data.win_rate}}%)
-            </p>`;
-
-            html += '<div style="display: flex; flex-direction: column; gap: 16px;">';
-
-            sortedStats.forEach(([stat, group]) => {{
-                const label = labels[stat] || stat;
-
-                html += `<div style="background: white; border: 1px solid #e5e5e5; border-radius: 8px; padding: 16px;">`;
-
-                // Titolo statistica
-                html += `<div style="text-align: center; margin-bottom: 12px;">`;
-                html += `<span style="font-weight: 700; color: var(--tp-secondary); font-size: 16px;">${{label}}</span>`;
-                html += `</div>`;
-
-                // Due colonne: fatte | subite
-                html += `<div style="display: grid; grid-template-columns: 1fr 1fr; gap: 16px;">`;
-
-                // Helper per creare una colonna
-                function createColumn(rowData, tipo, tipoColor) {{
-                    if (!rowData) {{
-                        return `<div style="background: #f9f9f9; border-radius: 8px; padding: 12px; text-align: center; color: #999;">N/D</div>`;
-                    }}
-
-                    const winVal = rowData['Media Vittorie'];
-                    const lossVal = rowData['Media Sconfitte'];
-                    const diffPct = rowData['Diff %'];
-                    const diffAbs = rowData['Differenza'];
-                    const diffSign = diffPct > 0 ? '+' : '';
-                    const diffAbsSign = diffAbs > 0 ? '+' : '';
-
-                    const winWidth = (winVal / maxValue) * 100;
-                    const lossWidth = (lossVal / maxValue) * 100;
-
-                    // Verde se positivo per fatte, verde se negativo per subite
-                    const isPositive = tipo === 'fatte' ? diffPct > 0 : diffPct < 0;
-                    const diffColor = isPositive ? '#22c55e' : '#ef4444';
-
-                    let col = `<div style="background: #f9f9f9; border-radius: 8px; padding: 12px;">`;
-
-                    // Header: tipo + variazione
-                    col += `<div style="text-align: center; margin-bottom: 10px;">`;
-                    col += `<span style="background: ${{tipoColor}}; color: white; padding: 3px 10px; border-radius: 12px; font-size: 12px; font-weight: 600;">${{tipo}}</span>`;
-                    col += `<div style="margin-top: 6px;">`;
-                    col += `<span style="font-size: 20px; font-weight: bold; color: ${{diffColor}};">${{diffSign}}${{diffPct}}%</span>`;
-                    col += `<span style="font-size: 13px; color: #666; margin-left: 6px;">(${{diffAbsSign}}${{diffAbs}})</span>`;
-                    col += `</div></div>`;
-
-                    // Barre
-                    col += `<div style="display: flex; flex-direction: column; gap: 4px;">`;
-
-                    // Vittorie
-                    col += `<div style="display: flex; align-items: center; gap: 6px;">`;
-                    col += `<div style="width: 16px; font-size: 10px; color: #22c55e; font-weight: bold;">V</div>`;
-                    col += `<div style="flex: 1; background: #e5e5e5; border-radius: 3px; height: 18px; position: relative; overflow: hidden;">`;
-                    col += `<div style="width: ${{winWidth}}%; background: #22c55e; height: 100%; border-radius: 3px;"></div>`;
-                    col += `<span style="position: absolute; left: 6px; top: 50%; transform: translateY(-50%); font-size: 11px; font-weight: 600; color: #166534;">${{winVal}}</span>`;
-                    col += `</div></div>`;
-
-                    // Sconfitte
-                    col += `<div style="display: flex; align-items: center; gap: 6px;">`;
-                    col += `<div style="width: 16px; font-size: 10px; color: #ef4444; font-weight: bold;">S</div>`;
-                    col += `<div style="flex: 1; background: #e5e5e5; border-radius: 3px; height: 18px; position: relative; overflow: hidden;">`;
-                    col += `<div style="width: ${{lossWidth}}%; background: #ef4444; height: 100%; border-radius: 3px;"></div>`;
-                    col += `<span style="position: absolute; left: 6px; top: 50%; transform: translateY(-50%); font-size: 11px; font-weight: 600; color: #991b1b;">${{lossVal}}</span>`;
-                    col += `</div></div>`;
-
-                    col += `</div></div>`;
-                    return col;
-                }}
-
-                // Colonna FATTE (sinistra)
-                html += createColumn(group.fatte, 'fatte', '#302B8F');
-
-                // Colonna SUBITE (destra)
-                html += createColumn(group.subite, 'subite', '#f97316');
-
-                html += `</div></div>`;
-            }});
-
-            html += '</div></div>';
-            contentDiv.innerHTML = html;
-        }}
-
-        // Inizializza
-        updatePlayerRadar();
-        updateTeamRadar();
-        if (document.getElementById('team-rules-select')) {{
-            showTeamRules();
-        }}
-        if (document.getElementById('winloss-team-select')) {{
-            showWinLossDiff();
-        }}
-    </script>
-</body>
-</html>
+        const playerRadarData = {_js_dumps(radar_data)};
+        const similarityData = {_js_dumps(similarity_js)};
+        const teamRulesStatsData = {_js_dumps(team_rules_stats_js)};
+        const teamRulesPlayersData = {_js_dumps(team_rules_players_js)};
+        const winLossData = {_js_dumps(win_loss_js)};
+        const teamRadarData = {_js_dumps(team_radar_data)};
+        const playerCategories = {_js_dumps([name for _, name in RADAR_STATS])};
+        const teamCategories = {_js_dumps([name for _, name in TEAM_RADAR_STATS])};
+        const profileStats = {_js_dumps(PROFILE_STATS)};
+        const profileColors = {_js_dumps(PROFILE_COLORS)};
 '''
+    yield _REPORT_SCRIPT_JS
 
-    return html
 
+def generate_advanced_report(overall_df, player_stats, campionato):
+    """
+    Genera un report HTML con tutte le analisi avanzate.
+    """
+    return ''.join(iter_advanced_report(overall_df, player_stats, campionato))
 
-def save_advanced_report(overall_df, player_stats, campionato, output_dir='.'):
+
+def save_advanced_report(overall_df, player_stats, campionato, output_dir='.', compress=False):
     """
     Salva il report HTML delle analisi avanzate.
+    Con compress=True scrive il file già compresso (.html.gz), da servire
+    con Content-Encoding: gzip.
     """
+    import gzip
     import os
 
-    html = generate_advanced_report(overall_df, player_stats, campionato)
     filename = os.path.join(output_dir, f'advanced_{campionato.lower().replace(" ", "_")}.html')
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(html)
+    if compress:
+        filename += '.gz'
+        opener = functools.partial(gzip.open, compresslevel=6)
+    else:
+        # Buffer da 1 MB: i blocchi piccoli (chiusure di sezione, opzioni) vengono
+        # accorpati e il file esce con poche write() invece di una per blocco
+        opener = functools.partial(open, buffering=1 << 20)
+
+    # Scrive i blocchi man mano che vengono generati, senza materializzare
+    # l'intero documento in memoria
+    with opener(filename, 'wb') as f:
+        for chunk in iter_advanced_report(overall_df, player_stats, campionato):
+            f.write(chunk.encode('utf-8'))
 
     print(f"Report avanzato salvato: {filename}")
     return filename
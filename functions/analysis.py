@@ -3,31 +3,62 @@ Modulo per l'analisi dei dati e la generazione di grafici.
 """
 
 import glob
+import hashlib
+import json
 import os
 import pickle
+import time
+from itertools import chain
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
+import plotly
 import plotly.express as px
 import plotly.colors as pc
-import Levenshtein
-from itertools import combinations
+import plotly.graph_objects as go
+from rapidfuzz import distance, process
 
 from .config import DATA_DIR
 
+# Directory per cache grafici (JSON Plotly)
+PLOTS_CACHE_DIR = os.path.join(DATA_DIR, 'plots_cache')
+# Versione dei grafici in cache: da incrementare quando cambia il codice che
+# li costruisce (px.scatter/px.box, add_median_lines, ...)
+PLOTS_CACHE_VERSION = 1
+# File della cache grafici letti o scritti in questa esecuzione
+_PLOTS_CACHE_USED = set()
+# Directory per cache correzioni nomi giocatori
+CORRECTIONS_CACHE_DIR = os.path.join(DATA_DIR, 'corrections_cache')
+# Versione dell'algoritmo di correzione: da incrementare quando cambiano
+# find_misspelled_names o la scelta del nome corretto
+CORRECTIONS_CACHE_VERSION = 1
+# Le correzioni non usate da più di 30 giorni vengono eliminate
+CORRECTIONS_CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Colonne testuali convertite al dtype stringa dopo il caricamento
+STRING_COLUMNS = ('Giocatore', 'Team', 'Opponent', 'Campionato', '2PT', '3PT', 'TL')
+# Dtype stringa esplicito con NaN come valore mancante (come il default di pandas 3):
+# con pandas 2 astype('str') darebbe object e trasformerebbe NaN nella stringa 'nan'
+STRING_DTYPE = pd.StringDtype(na_value=np.nan)
+
+# Colonne tiro "realizzati/tentati" e colonne numeriche ricavate
+SHOT_COLUMNS = (('2PT', '2PTM', '2PTA'), ('3PT', '3PTM', '3PTA'), ('TL', 'FTM', 'FTA'))
+
+# Palette ampia con colori distinguibili (costruita una volta all'import)
+TEAM_COLORS = tuple(chain(
+    pc.qualitative.Plotly,
+    pc.qualitative.D3,
+    pc.qualitative.Set1,
+    pc.qualitative.Set2,
+    pc.qualitative.Pastel1,
+))
+
 
 def get_team_color_map(teams):
     """Crea una mappa colori consistente per le squadre."""
-    # Usa una palette ampia con colori distinguibili
-    colors = (
-        pc.qualitative.Plotly +
-        pc.qualitative.D3 +
-        pc.qualitative.Set1 +
-        pc.qualitative.Set2 +
-        pc.qualitative.Pastel1
-    )
-    sorted_teams = sorted(teams)
-    return {team: colors[i % len(colors)] for i, team in enumerate(sorted_teams)}
+    # Ordine alfabetico: squadre diverse hanno colori diversi (fino a esaurimento palette)
+    return {team: TEAM_COLORS[i % len(TEAM_COLORS)] for i, team in enumerate(sorted(teams))}
 
 
 def add_median_lines(df, labx, laby, fig):
@@ -45,41 +76,121 @@ def add_median_lines(df, labx, laby, fig):
     return fig
 
 
-def find_similar_strings(strings, threshold=0.2):
-    """Trova stringhe simili in una lista."""
-    similarities = {}
-    for a, b in combinations(strings, 2):
-        set_a = set(a.split())
-        set_b = set(b.split())
-        common_words = set_a.intersection(set_b).intersection({"Pallacanestro", "Virtus", "Basket"})
-        set_a = set_a - common_words
-        set_b = set_b - common_words
-        if len(set_a.union(set_b)) > 0:
-            similarity = len(set_a.intersection(set_b)) / len(set_a.union(set_b))
-            if similarity >= threshold:
-                similarities[(a, b)] = similarity
-    return list(set([tuple(sorted(pair)) for pair in similarities.keys()]))
+def cached_figure(df, cols, params, build):
+    """
+    Restituisce il grafico costruito da build(), salvato in cache su disco.
+
+    La chiave dipende dalle colonne di df usate dal grafico, dai parametri,
+    da PLOTS_CACHE_VERSION e dalla versione di Plotly: se nulla cambia il
+    grafico viene riletto dal JSON.
+    """
+    key = hashlib.sha1()
+    key.update(pd.util.hash_pandas_object(df[cols], index=False).to_numpy().tobytes())
+    key.update(repr((cols, params, PLOTS_CACHE_VERSION, plotly.__version__)).encode())
+    cache_path = os.path.join(PLOTS_CACHE_DIR, f'{key.hexdigest()}.json')
+    _PLOTS_CACHE_USED.add(os.path.basename(cache_path))
+    if os.path.exists(cache_path):
+        # Il JSON è già stato validato alla creazione: rileggerlo con
+        # pio.from_json costerebbe quanto ricostruire il grafico
+        with open(cache_path, 'r') as f:
+            return go.Figure(json.load(f), _validate=False)
+
+    fig = build()
+    os.makedirs(PLOTS_CACHE_DIR, exist_ok=True)
+    with open(cache_path, 'w') as f:
+        f.write(fig.to_json())
+    return fig
+
+
+def prune_plots_cache():
+    """
+    Elimina dalla cache i grafici non usati in questa esecuzione
+    (dati cambiati o versione precedente). Da chiamare dopo aver generato tutti i report.
+
+    Returns:
+        numero di file eliminati
+    """
+    if not os.path.isdir(PLOTS_CACHE_DIR):
+        return 0
+    removed = 0
+    for name in os.listdir(PLOTS_CACHE_DIR):
+        if name.endswith('.json') and name not in _PLOTS_CACHE_USED:
+            os.remove(os.path.join(PLOTS_CACHE_DIR, name))
+            removed += 1
+    return removed
+
+
+def scatter_with_medians(df, x, y, color_map, size=None, pct_y=False):
+    """Scatter per squadra con linee mediane (in cache su disco)."""
+    def build():
+        fig = px.scatter(df, x=x, y=y, size=size, color='Team',
+                         hover_name='Giocatore', color_discrete_map=color_map)
+        fig = add_median_lines(df, x, y, fig)
+        if pct_y:
+            fig.update_layout(yaxis_tickformat='.0%')
+        return fig
+
+    cols = [x, y, 'Team', 'Giocatore'] + ([size] if size else [])
+    return cached_figure(df, cols, ('scatter', pct_y, sorted(color_map.items())), build)
 
 
-def levenshtein_distance(s1, s2):
-    """Calcola la distanza di Levenshtein tra due stringhe."""
-    return Levenshtein.distance(s1.lower(), s2.lower())
+def find_similar_strings(strings, threshold=0.2):
+    """Trova stringhe simili in una lista."""
+    strings = list(strings)
+    if len(strings) < 2:
+        return []
+
+    # Matrice binaria stringhe x parole: intersezioni e unioni (Jaccard)
+    # di tutte le coppie con un solo prodotto sparso
+    vocab = {}
+    indptr, indices = [0], []
+    for string in strings:
+        indices.extend({vocab.setdefault(word, len(vocab)) for word in string.split()})
+        indptr.append(len(indices))
+    words = sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr),
+                              shape=(len(strings), len(vocab)))
+    sizes = np.diff(words.indptr)
+    inter = (words @ words.T).toarray()
+    union = sizes[:, None] + sizes[None, :] - inter
+
+    # Le parole generiche presenti in entrambe le stringhe non contano
+    generic = [vocab[w] for w in ("Pallacanestro", "Virtus", "Basket") if w in vocab]
+    if generic:
+        common = (words[:, generic] @ words[:, generic].T).toarray()
+        inter = inter - common
+        union = union - common
+
+    similarity = np.divide(inter, union, out=np.zeros(inter.shape), where=union > 0)
+    i, j = np.nonzero(np.triu((union > 0) & (similarity >= threshold), k=1))
+    return list(set(tuple(sorted((strings[a], strings[b]))) for a, b in zip(i.tolist(), j.tolist())))
 
 
 def find_misspelled_names(df, threshold):
     """Trova nomi di giocatori potenzialmente scritti male."""
+    # Nomi raggruppati per squadra (ordine di prima apparizione) con numpy:
+    # niente slicing pandas per ogni squadra
+    team_codes, _ = pd.factorize(df['Team'])
+    order = np.argsort(team_codes, kind='stable')
+    all_names = df['Giocatore'].to_numpy()[order]
+    bounds = np.flatnonzero(np.diff(team_codes[order])) + 1
+
     misspelled_pairs = []
-    for team in df['Team'].unique():
-        team_df = df[df['Team'] == team]
-        for i in range(len(team_df)):
-            for j in range(i + 1, len(team_df)):
-                name1 = team_df.iloc[i]['Giocatore']
-                name2 = team_df.iloc[j]['Giocatore']
-                # Se le iniziali sono diverse, sono persone diverse (es. S. Bossi vs L. Bosso)
-                if name1[0] != name2[0]:
-                    continue
-                if levenshtein_distance(name1, name2) / len(name1) <= threshold:
-                    misspelled_pairs.append((name1, name2))
+    for names in np.split(all_names, bounds):
+        if len(names) < 2:
+            continue
+        lower = [n.lower() for n in names]
+        lengths = np.array([len(n) for n in names])
+        # Matrice completa delle distanze (in C); oltre la soglia massima
+        # ammessa nel gruppo il calcolo si interrompe (restituisce cutoff + 1)
+        cutoff = int(threshold * lengths.max())
+        dist = process.cdist(lower, lower, scorer=distance.Levenshtein.distance,
+                             score_cutoff=cutoff, dtype=np.int32)
+        # Se le iniziali sono diverse, sono persone diverse (es. S. Bossi vs L. Bosso)
+        initials = np.array([n[0] for n in names])
+        mask = (dist / lengths[:, None] <= threshold) & (initials[:, None] == initials[None, :])
+        i, j = np.nonzero(mask)
+        upper = i < j
+        misspelled_pairs.extend(zip(names[i[upper]].tolist(), names[j[upper]].tolist()))
     return misspelled_pairs
 
 
@@ -107,12 +218,20 @@ def load_all_data(campionato_filtro=None):
                 if camp_name == 'season_stats':
                     camp_name = 'legacy'
                 df_temp['Campionato'] = camp_name
+            # Filtra prima della concatenazione: si copiano solo le righe utili
+            if campionato_filtro:
+                df_temp = df_temp[df_temp['Campionato'] == campionato_filtro]
             dfs.append(df_temp)
 
-    overall_df = pd.concat(dfs)
+    # L'indice dei file pickle non è univoco: si ricostruisce senza allinearlo
+    overall_df = pd.concat(dfs, ignore_index=True)
+
+    # Colonne testuali come dtype stringa di pandas: confronti, map ed estrazioni
+    # regex usano i metodi del dtype stringa invece di colonne object generiche
+    string_cols = [c for c in STRING_COLUMNS if c in overall_df.columns]
+    overall_df[string_cols] = overall_df[string_cols].astype(STRING_DTYPE)
 
     if campionato_filtro:
-        overall_df = overall_df[overall_df['Campionato'] == campionato_filtro]
         report_suffix = f"_{campionato_filtro}"
         print(f"Filtrato per campionato: {campionato_filtro}")
     else:
@@ -122,6 +241,65 @@ def load_all_data(campionato_filtro=None):
     return overall_df, report_suffix
 
 
+def replace_values(values, mapping):
+    """Sostituisce i valori presenti in mapping con un solo map vettoriale."""
+    if not mapping:
+        return values
+    return values.map(mapping).fillna(values)
+
+
+def prune_corrections_cache():
+    """Elimina le correzioni in cache non usate da più di CORRECTIONS_CACHE_MAX_AGE."""
+    limit = time.time() - CORRECTIONS_CACHE_MAX_AGE
+    for entry in os.scandir(CORRECTIONS_CACHE_DIR):
+        if entry.name.endswith('.json') and entry.stat().st_mtime < limit:
+            os.remove(entry.path)
+
+
+def find_name_corrections(players, threshold):
+    """
+    Calcola le correzioni {nome errato: nome corretto} per i giocatori.
+
+    players: DataFrame con colonne Giocatore e Team (una riga per partita).
+    Il risultato è salvato in cache su disco, con chiave l'hash delle righe,
+    la soglia e CORRECTIONS_CACHE_VERSION: se nulla cambia la ricerca dei
+    nomi simili viene saltata.
+    """
+    key = hashlib.sha1()
+    key.update(pd.util.hash_pandas_object(players, index=False).to_numpy().tobytes())
+    key.update(repr((threshold, CORRECTIONS_CACHE_VERSION)).encode())
+    cache_path = os.path.join(CORRECTIONS_CACHE_DIR, f'{key.hexdigest()}.json')
+    if os.path.exists(cache_path):
+        # La data di modifica segna l'ultimo utilizzo (per la pulizia)
+        os.utime(cache_path)
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+
+    player_team_pairs = players.drop_duplicates()
+    misspelled_pairs = find_misspelled_names(player_team_pairs, threshold=threshold)
+
+    # Squadra della prima riga di ogni giocatore e righe per coppia
+    # (giocatore, squadra): un solo passaggio invece di una scansione per nome
+    first_team = dict(player_team_pairs.drop_duplicates('Giocatore').to_numpy().tolist())
+    pair_counts = players.groupby(['Giocatore', 'Team'], sort=False).size().to_dict()
+
+    corrections = {}
+    for name1, name2 in misspelled_pairs:
+        team = first_team[name1]
+        name1_count = pair_counts.get((name1, team), 0)
+        name2_count = pair_counts.get((name2, team), 0)
+        if name1_count >= name2_count:
+            corrections[name2] = name1
+        else:
+            corrections[name1] = name2
+
+    os.makedirs(CORRECTIONS_CACHE_DIR, exist_ok=True)
+    prune_corrections_cache()
+    with open(cache_path, 'w') as f:
+        json.dump(corrections, f, indent=2, ensure_ascii=False)
+    return corrections
+
+
 def preprocess_data(overall_df, similar_teams=None, min_minutes=100):
     """
     Preprocessa i dati per l'analisi.
@@ -137,54 +315,59 @@ def preprocess_data(overall_df, similar_teams=None, min_minutes=100):
     overall_df = overall_df.copy()
     overall_df.reset_index(inplace=True, drop=True)
 
-    # Parsing colonne tiro
-    overall_df[['2PTM', '2PTA']] = overall_df['2PT'].str.split('/', expand=True).apply(pd.to_numeric)
-    overall_df[['3PTM', '3PTA']] = overall_df['3PT'].str.split('/', expand=True).apply(pd.to_numeric)
-    overall_df[['FTM', 'FTA']] = overall_df['TL'].str.split('/', expand=True).apply(pd.to_numeric)
+    # Parsing colonne tiro ("realizzati/tentati") con un'estrazione regex vettoriale
+    # per colonna: valori mancanti o malformati diventano NaN invece di un errore
+    for col, made, attempted in SHOT_COLUMNS:
+        parsed = overall_df[col].str.extract(r'^\s*(\d+)\s*/\s*(\d+)\s*$')
+        overall_df[made] = pd.to_numeric(parsed[0], errors='coerce')
+        overall_df[attempted] = pd.to_numeric(parsed[1], errors='coerce')
 
     # Normalizza nomi squadre (usa sempre il secondo nome come standard)
     if similar_teams:
-        for variant, standard in similar_teams:
-            # Normalizza Team
-            mask = overall_df["Team"] == variant
-            if mask.any():
-                overall_df.loc[mask, "Team"] = standard
-            # Normalizza anche Opponent
-            if "Opponent" in overall_df.columns:
-                mask_opp = overall_df["Opponent"] == variant
-                if mask_opp.any():
-                    overall_df.loc[mask_opp, "Opponent"] = standard
+        team_names = dict(similar_teams)
+        overall_df["Team"] = replace_values(overall_df["Team"], team_names)
+        # Normalizza anche Opponent
+        if "Opponent" in overall_df.columns:
+            overall_df["Opponent"] = replace_values(overall_df["Opponent"], team_names)
 
     # Correggi nomi giocatori simili
-    player_team_pairs = overall_df[['Giocatore', 'Team']].drop_duplicates()
-    misspelled_pairs = find_misspelled_names(player_team_pairs, threshold=0.3)
-
-    corrections = {}
-    for name1, name2 in misspelled_pairs:
-        team = overall_df.loc[overall_df['Giocatore'] == name1, 'Team'].iloc[0]
-        name1_count = overall_df.loc[(overall_df['Giocatore'] == name1) & (overall_df['Team'] == team)].shape[0]
-        name2_count = overall_df.loc[(overall_df['Giocatore'] == name2) & (overall_df['Team'] == team)].shape[0]
-        if name1_count >= name2_count:
-            corrections[name2] = name1
-        else:
-            corrections[name1] = name2
-
-    overall_df['Giocatore'] = overall_df['Giocatore'].replace(corrections)
+    corrections = find_name_corrections(overall_df[['Giocatore', 'Team']], threshold=0.3)
+    overall_df['Giocatore'] = replace_values(overall_df['Giocatore'], corrections)
 
     # Filtra giocatori con minuti minimi
-    player_minutes = overall_df.groupby(['Giocatore', 'Team'])['Minutes'].sum()
-    selected_players = player_minutes[player_minutes > min_minutes].index
-    overall_df = overall_df[overall_df.set_index(['Giocatore', 'Team']).index.isin(selected_players)]
+    player_minutes = overall_df.groupby(['Giocatore', 'Team'], sort=False)['Minutes'].sum()
+    keys = pd.MultiIndex.from_frame(overall_df[['Giocatore', 'Team']])
+    overall_df = overall_df[player_minutes.reindex(keys).to_numpy() > min_minutes]
 
     # Aggiungi colonne derivate
     overall_df['Result'] = overall_df['Gap'] > 0
     overall_df['Tight'] = np.abs(overall_df['Gap']) < 5
-    overall_df.loc[np.abs(overall_df['pm_permin']) > 10, 'pm_permin'] = np.nan
-    overall_df["pm_permin_adj"] = overall_df['pm_permin'] - overall_df['Gap_permin']
+    # Valori anomali di +/- al minuto a NaN: mascheramento sull'array numpy
+    # (con copy-on-write l'array della colonna è in sola lettura, serve una copia)
+    pm_permin = overall_df['pm_permin'].to_numpy(dtype=np.float64, copy=True)
+    np.putmask(pm_permin, np.abs(pm_permin) > 10, np.nan)
+    overall_df['pm_permin'] = pm_permin
+    overall_df["pm_permin_adj"] = pm_permin - overall_df['Gap_permin'].to_numpy()
 
     return overall_df
 
 
+def _group_by_player(overall_df):
+    """
+    Raggruppa per (Giocatore, Team) su chiavi category, convertite solo qui:
+    il groupby lavora sui codici interi e il DataFrame non viene modificato.
+    """
+    keys = [overall_df[col].astype('category') for col in ('Giocatore', 'Team')]
+    return overall_df.groupby(keys, observed=True)
+
+
+def _restore_key_dtypes(df, overall_df):
+    """Riporta Giocatore e Team di df (dopo reset_index) al dtype di overall_df."""
+    for col in ('Giocatore', 'Team'):
+        df[col] = df[col].astype(overall_df[col].dtype)
+    return df
+
+
 def compute_aggregated_stats(overall_df):
     """
     Calcola statistiche aggregate per giocatore.
@@ -193,36 +376,39 @@ def compute_aggregated_stats(overall_df):
         sum_df: DataFrame con somme
         median_df: DataFrame con mediane
     """
-    sum_df = overall_df.groupby(['Giocatore', 'Team']).sum(numeric_only=True)
-
-    # Rapporti
-    sum_df['AS_PP_ratio'] = sum_df['AS'] / sum_df['PP']
-    sum_df['PR_PP_ratio'] = sum_df['PR'] / sum_df['PP']
-    sum_df['FS_FF_ratio'] = sum_df['FS'] / sum_df['FF']
-    sum_df['ST_FF_ratio'] = sum_df['ST'] / sum_df['FF']
-    sum_df['AS_PP_perc'] = sum_df['AS'] / (sum_df['PP'] + sum_df['AS'])
-
-    # Per minuto
-    sum_df['AS_permin'] = sum_df['AS'] / sum_df['Minutes']
-    sum_df['PT_permin'] = sum_df['PT'] / sum_df['Minutes']
-    sum_df['RO_permin'] = sum_df['RO'] / sum_df['Minutes']
-    sum_df['RD_permin'] = sum_df['RD'] / sum_df['Minutes']
-    sum_df['PR_permin'] = sum_df['PR'] / sum_df['Minutes']
-    sum_df['FS_permin'] = sum_df['FS'] / sum_df['Minutes']
-    sum_df['FF_permin'] = sum_df['FF'] / sum_df['Minutes']
-    sum_df['ST_permin'] = sum_df['ST'] / sum_df['Minutes']
-    sum_df['3PTM_permin'] = sum_df['3PTM'] / sum_df['Minutes']
-    sum_df['FTA_permin'] = sum_df['FTA'] / sum_df['Minutes']
-
-    # Percentuali tiro
-    sum_df['True_shooting'] = sum_df['PT'] / 2 / (sum_df['2PTA'] + sum_df['3PTA'] + 0.44 * sum_df['FTA'])
-    sum_df['3PT_%'] = sum_df['3PTM'] / sum_df['3PTA']
-    sum_df['FT_%'] = sum_df['FTM'] / sum_df['FTA']
+    sum_df = _group_by_player(overall_df).sum(numeric_only=True)
+
+    # Colonne derivate calcolate su array numpy e inserite con un solo assign
+    needed = ['Minutes', 'AS', 'PP', 'PR', 'FS', 'FF', 'ST', 'PT', 'RO', 'RD',
+              '2PTA', '3PTM', '3PTA', 'FTM', 'FTA']
+    # I blocchi restituiti da groupby.sum sono in ordine Fortran: le colonne
+    # si copiano una volta in un array C-contiguo (una riga per colonna)
+    values = np.ascontiguousarray(sum_df[needed].to_numpy(dtype=np.float64).T)
+    col = dict(zip(needed, values))
+    minutes = col['Minutes']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived = {
+            # Rapporti
+            'AS_PP_ratio': col['AS'] / col['PP'],
+            'PR_PP_ratio': col['PR'] / col['PP'],
+            'FS_FF_ratio': col['FS'] / col['FF'],
+            'ST_FF_ratio': col['ST'] / col['FF'],
+            'AS_PP_perc': col['AS'] / (col['PP'] + col['AS']),
+        }
+        # Per minuto
+        for c in ['AS', 'PT', 'RO', 'RD', 'PR', 'FS', 'FF', 'ST', '3PTM', 'FTA']:
+            derived[f'{c}_permin'] = col[c] / minutes
+        # Percentuali tiro
+        derived['True_shooting'] = col['PT'] / 2 / (col['2PTA'] + col['3PTA'] + 0.44 * col['FTA'])
+        derived['3PT_%'] = col['3PTM'] / col['3PTA']
+        derived['FT_%'] = col['FTM'] / col['FTA']
+    sum_df = sum_df.assign(**derived)
 
     sum_df.reset_index(inplace=True)
+    _restore_key_dtypes(sum_df, overall_df)
 
     # Mediane
-    median_df = overall_df.groupby(['Giocatore', 'Team']).agg({
+    median_df = _group_by_player(overall_df).agg({
         'pm_permin_adj': 'median',
         'Minutes': 'sum',
         'Gap_permin': 'median',
@@ -231,6 +417,7 @@ def compute_aggregated_stats(overall_df):
     median_df['pm_permin_adj_plusgap'] = median_df['pm_permin_adj'] + median_df['Gap_permin']
     median_df.sort_values(inplace=True, by='pm_permin_adj_plusgap')
     median_df.reset_index(inplace=True)
+    _restore_key_dtypes(median_df, overall_df)
 
     return sum_df, median_df
 
@@ -251,112 +438,85 @@ def create_all_plots(overall_df, sum_df, median_df):
 
     # Grafici per squadra (dropdown)
     team_plots = []
-    for team in sorted(overall_df['Team'].unique()):
-        team_data = overall_df[overall_df['Team'] == team]
-        fig = px.box(team_data, x='Giocatore', y='pm_permin_adj', color='Tight', points="all",
-                     hover_data={'Opponent': True, 'Gap': True}, category_orders=category_order)
+    for team, team_data in overall_df.groupby('Team'):
+        fig = cached_figure(
+            team_data, ['Giocatore', 'pm_permin_adj', 'Tight', 'Opponent', 'Gap'], ('box', category_order),
+            lambda: px.box(team_data, x='Giocatore', y='pm_permin_adj', color='Tight', points="all",
+                           hover_data={'Opponent': True, 'Gap': True}, category_orders=category_order))
         team_plots.append((fig, team))
 
     # Grafici principali: (fig, caption, title)
     plots = []
 
     # 1. +/- adjusted vs +/-
-    fig = px.scatter(median_df, x='pm_permin_adj', y='pm_permin', size='Minutes',
-                     color='Team', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(median_df, 'pm_permin_adj', 'pm_permin', fig)
+    fig = scatter_with_medians(median_df, 'pm_permin_adj', 'pm_permin', color_map, size='Minutes')
     plots.append((fig,
                   'In alto giocatori che fanno bene con dipendenza anche dal risultato di squadra, '
                   'a destra giocatori che fanno meglio del risultato di squadra',
                   '+/- Adjusted vs +/- Raw'))
 
     # 2. Assist
-    fig = px.scatter(sum_df, x='AS_permin', y='AS_PP_ratio', size='AS',
-                     color='Team', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, 'AS_permin', 'AS_PP_ratio', fig)
+    fig = scatter_with_medians(sum_df, 'AS_permin', 'AS_PP_ratio', color_map, size='AS')
     plots.append((fig,
                   'Assist al minuto vs rapporto assist/palle perse',
                   'Efficienza Assist'))
 
     # 3. Assist vs Punti
-    fig = px.scatter(sum_df, x='AS_permin', y='PT_permin', color='Team',
-                     hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, 'AS_permin', 'PT_permin', fig)
+    fig = scatter_with_medians(sum_df, 'AS_permin', 'PT_permin', color_map)
     plots.append((fig,
                   'Assist al minuto vs punti al minuto',
                   'Produzione Offensiva'))
 
     # 4. Rimbalzi
-    fig = px.scatter(sum_df, x='RD_permin', y='RO_permin', size='RT',
-                     color='Team', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, 'RD_permin', 'RO_permin', fig)
+    fig = scatter_with_medians(sum_df, 'RD_permin', 'RO_permin', color_map, size='RT')
     plots.append((fig,
                   'Rimbalzi difensivi al minuto vs rimbalzi offensivi al minuto',
                   'Efficienza a Rimbalzo'))
 
     # 5. True shooting vs AS/PP
-    fig = px.scatter(sum_df, x='AS_PP_ratio', y='True_shooting', color='Team',
-                     size='PT', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, 'AS_PP_ratio', 'True_shooting', fig)
-    fig.update_layout(yaxis_tickformat='.0%')
+    fig = scatter_with_medians(sum_df, 'AS_PP_ratio', 'True_shooting', color_map, size='PT', pct_y=True)
     plots.append((fig,
                   'Rapporto assist-PP vs True shooting percentage',
                   'Efficienza sugli Errori'))
 
     # 6. True shooting vs PT/min
-    fig = px.scatter(sum_df, x='PT_permin', y='True_shooting', color='Team',
-                     size='PT', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, 'PT_permin', 'True_shooting', fig)
-    fig.update_layout(yaxis_tickformat='.0%')
+    fig = scatter_with_medians(sum_df, 'PT_permin', 'True_shooting', color_map, size='PT', pct_y=True)
     plots.append((fig,
                   'Punti al minuto vs True shooting percentage',
                   'Efficienza al Tiro'))
 
     # 7. 3PT
-    fig = px.scatter(sum_df, x='3PTM_permin', y='3PT_%', color='Team',
-                     size='3PTM', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, '3PTM_permin', '3PT_%', fig)
-    fig.update_layout(yaxis_tickformat='.0%')
+    fig = scatter_with_medians(sum_df, '3PTM_permin', '3PT_%', color_map, size='3PTM', pct_y=True)
     plots.append((fig,
                   'Triple realizzate al minuto vs percentuale da 3',
                   'Tiro da 3 Punti'))
 
     # 8. Free throws
-    fig = px.scatter(sum_df, x='FTA_permin', y='FT_%', color='Team',
-                     size='FTA', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, 'FTA_permin', 'FT_%', fig)
-    fig.update_layout(yaxis_tickformat='.0%')
+    fig = scatter_with_medians(sum_df, 'FTA_permin', 'FT_%', color_map, size='FTA', pct_y=True)
     plots.append((fig,
                   'Tiri liberi tentati al minuto vs percentuale ai liberi',
                   'Tiri Liberi'))
 
     # 9. Palloni recuperati
-    fig = px.scatter(sum_df, x='PR_permin', y='PR_PP_ratio', color='Team',
-                     size='PR', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, 'PR_permin', 'PR_PP_ratio', fig)
+    fig = scatter_with_medians(sum_df, 'PR_permin', 'PR_PP_ratio', color_map, size='PR')
     plots.append((fig,
                   'Palloni recuperati al minuto vs rapporto PR/PP',
                   'Palloni Recuperati'))
 
     # 10. Falli subiti
-    fig = px.scatter(sum_df, x='FS_permin', y='FS_FF_ratio', color='Team',
-                     size='FS', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, 'FS_permin', 'FS_FF_ratio', fig)
+    fig = scatter_with_medians(sum_df, 'FS_permin', 'FS_FF_ratio', color_map, size='FS')
     plots.append((fig,
                   'Falli subiti al minuto vs rapporto falli subiti/fatti',
                   'Falli Subiti'))
 
     # 11. Stoppate
-    fig = px.scatter(sum_df, x='ST_permin', y='ST_FF_ratio', color='Team',
-                     size='ST', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, 'ST_permin', 'ST_FF_ratio', fig)
+    fig = scatter_with_medians(sum_df, 'ST_permin', 'ST_FF_ratio', color_map, size='ST')
     plots.append((fig,
                   'Stoppate al minuto vs rapporto stoppate/falli fatti',
                   'Stoppate'))
 
     # 12. Falli fatti
-    fig = px.scatter(sum_df, x='FF_permin', y='FF', color='Team',
-                     size='Minutes', hover_name='Giocatore', color_discrete_map=color_map)
-    fig = add_median_lines(sum_df, 'FF_permin', 'FF', fig)
+    fig = scatter_with_medians(sum_df, 'FF_permin', 'FF', color_map, size='Minutes')
     plots.append((fig,
                   'Falli fatti al minuto vs totale falli',
                   'Falli Fatti'))
@@ -5,13 +5,77 @@ Permette di usare dati ufficiali come fonte autoritativa per V/S/Punti.
 
 import os
 import json
+import threading
 import time
+import http.client
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from bs4 import BeautifulSoup
+from functools import lru_cache
+from lxml import etree
+
+try:
+    import orjson
+except ImportError:  # opzionale: senza orjson si usa json della libreria standard
+    orjson = None
 
 # Directory per cache classifiche
 CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'official_cache')
 
+# Classifiche già lette in questo processo: {campionato: (mtime_ns, letto_alle, dati)}
+_STANDINGS_MEMO = {}
+# Secondi dopo i quali il file viene comunque riletto
+STANDINGS_MEMO_TTL = 60
+# Indici per il matching: {campionato: (standings ufficiali, indice per nome)}
+_OFFICIAL_INDEX_MEMO = {}
+
+# Dimensione dei blocchi letti dalla rete e passati al parser HTML
+CHUNK_SIZE = 65536
+# Frammenti di testo di una cella come get_text(): esclusi <script> e <style>
+CELL_TEXT = etree.XPath('.//text()[not(ancestor::script or ancestor::style)]')
+
+# Pagine classifiche sul sito ufficiale LNP
+SERIE_B_URL = "https://www.legapallacanestro.com/serie/4/classifica"
+SERIE_A2_URL = "https://www.legapallacanestro.com/serie-a2/classifica"
+
+# undetected_chromedriver modifica il binario del driver all'avvio:
+# le istanze vanno create una alla volta anche se lo scraping è parallelo
+_DRIVER_LOCK = threading.Lock()
+
+# Mappatura diretta per casi problematici (squadre con stessa città)
+TEAM_DIRECT_MAPPINGS = {
+    'gema montecatini': 'gema montecatini',
+    'gema': 'gema montecatini',
+    'la t tecnica': 'gema montecatini',
+    'herons montecatini': 'herons montecatini',
+    'herons': 'herons montecatini',
+    'fabo': 'herons montecatini',
+    'bakery': 'bakery piacenza',
+    'assigeco': 'assigeco piacenza',
+    'ucc assigeco': 'assigeco piacenza',
+    'andrea costa': 'andrea costa imola',
+    'virtus imola': 'virtus imola',
+}
+
+# Parole chiave identificative (escluse città con più squadre gestite sopra)
+TEAM_KEYWORDS = (
+    'vigevano', 'orzinuovi', 'vendemiano', 'lumezzane',
+    'desio', 'omegna', 'agrigento', 'fidenza', 'legnano',
+    'treviglio', 'monferrato', 'vicenza', 'armerina', 'fiorenzuola',
+    'orlando', 'livorno', 'avellino', 'fortitudo', 'casoria', 'nardò',
+    'chiusi', 'latina', 'rieti', 'cento', 'forlì',
+    'cantù', 'torino', 'udine', 'verona', 'cremona', 'rimini',
+    'pesaro', 'scafati', 'mestre', 'ferrara', 'roseto', 'milano',
+    'varese', 'trieste', 'pistoia', 'napoli', 'brindisi', 'sassari',
+    'cagliari', 'pavia', 'teramo', 'mantova', 'bergamo', 'ancona',
+    'civitanova', 'ravenna', 'jesi', 'fabriano', 'siena', 'arezzo',
+    'ozzano', 'san miniato', 'empoli', 'piombino',
+    'faenza', 'cesena', 'senigallia', 'san severo', 'monopoli',
+    'ruvo', 'corato', 'bisceglie', 'molfetta', 'taranto', 'cerignola',
+    'salerno', 'battipaglia', 'torre del greco', 'portici', 'castellammare'
+)
+
 
 def ensure_cache_dir():
     """Crea directory cache se non esiste."""
@@ -31,10 +95,21 @@ def load_cached_standings(campionato):
         dict con standings e metadata, o None se cache non esiste
     """
     cache_path = get_cache_path(campionato)
-    if os.path.exists(cache_path):
-        with open(cache_path, 'r') as f:
-            return json.load(f)
-    return None
+    try:
+        mtime_ns = os.stat(cache_path).st_mtime_ns
+    except FileNotFoundError:
+        _STANDINGS_MEMO.pop(campionato, None)
+        return None
+
+    # Stesso file (mtime invariato) letto da poco: niente nuovo json.load
+    memo = _STANDINGS_MEMO.get(campionato)
+    if memo and memo[0] == mtime_ns and time.monotonic() - memo[1] < STANDINGS_MEMO_TTL:
+        return memo[2]
+
+    with open(cache_path, 'rb') as f:
+        data = orjson.loads(f.read()) if orjson is not None else json.load(f)
+    _STANDINGS_MEMO[campionato] = (mtime_ns, time.monotonic(), data)
+    return data
 
 
 def save_standings_cache(campionato, standings_data):
@@ -47,8 +122,61 @@ def save_standings_cache(campionato, standings_data):
         'standings': standings_data
     }
 
-    with open(cache_path, 'w') as f:
-        json.dump(cache_data, f, indent=2, ensure_ascii=False)
+    # File letto solo dal programma: JSON compatto, con orjson se disponibile
+    if orjson is not None:
+        with open(cache_path, 'wb') as f:
+            f.write(orjson.dumps(cache_data))
+    else:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache_data, f, ensure_ascii=False, separators=(',', ':'))
+    _STANDINGS_MEMO.pop(campionato, None)
+    _OFFICIAL_INDEX_MEMO.pop(campionato, None)
+
+
+def fetch_table_rows(url, timeout=20):
+    """
+    Scarica una pagina senza avviare il browser e ne estrae le righe delle
+    tabelle man mano che arrivano i blocchi (download e parsing insieme).
+
+    Returns:
+        list di tabelle come extract_table_rows, o None se la richiesta fallisce
+    """
+    request = urllib.request.Request(url, headers={
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+        'Accept-Encoding': 'gzip',
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            charset = response.headers.get_content_charset() or 'utf-8'
+            if response.headers.get('Content-Encoding') == 'gzip':
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                chunks = (decompressor.decompress(chunk)
+                          for chunk in iter(lambda: response.read(CHUNK_SIZE), b''))
+            else:
+                chunks = iter(lambda: response.read(CHUNK_SIZE), b'')
+            return stream_table_rows(chunks, encoding=charset)
+    except (OSError, ValueError, zlib.error, etree.ParseError, http.client.HTTPException) as e:
+        print(f"Errore download {url}: {e}")
+        return None
+
+
+def wait_for_element(driver, selector, timeout=15, by=None):
+    """
+    Attende che un elemento sia presente nella pagina (al posto di sleep fissi).
+    selector è un selettore CSS, oppure del tipo indicato da by (es. By.XPATH).
+    Allo scadere del timeout prosegue comunque con il contenuto disponibile.
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((by or By.CSS_SELECTOR, selector)))
+    except TimeoutException:
+        print(f"Timeout in attesa di '{selector}'")
 
 
 def scrape_serie_b_standings(driver):
@@ -58,43 +186,112 @@ def scrape_serie_b_standings(driver):
     Returns:
         dict con {'girone_a': [...], 'girone_b': [...]}
     """
-    url = "https://www.legapallacanestro.com/serie/4/classifica"
-    driver.get(url)
-    time.sleep(4)
+    driver.get(SERIE_B_URL)
+    wait_for_element(driver, "table tr")
+    return parse_serie_b_standings(driver.page_source)
 
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
 
-    results = {'girone_a': [], 'girone_b': []}
+def _to_int(s):
+    """Converte il testo di una cella in intero (0 se non numerico)."""
+    return int(s) if s.isdigit() else 0
+
+
+def stream_table_rows(chunks, encoding='utf-8'):
+    """
+    Estrae il testo delle celle (td/th) di ogni riga, tabella per tabella,
+    leggendo l'HTML a blocchi: ogni <tr> viene letta appena chiusa e poi svuotata.
+    Come get_text(strip=True): frammenti di testo ripuliti e concatenati.
+
+    Returns:
+        list di tabelle, ognuna list di righe (list di testi delle celle)
+    """
+    parser = etree.HTMLPullParser(events=('start', 'end'), tag=('table', 'tr'),
+                                  encoding=encoding)
+    tables = []
+    open_tables = []  # tabelle aperte (anche annidate) in cui cade la riga corrente
+    open_rows = []    # per ogni <tr> aperta: posizioni riservate nelle tabelle
+
+    def consume_events():
+        for event, elem in parser.read_events():
+            if elem.tag == 'table':
+                if event == 'start':
+                    tables.append([])
+                    open_tables.append(tables[-1])
+                else:
+                    open_tables.pop()
+            elif event == 'start':
+                # Posto riservato in ordine di apertura, come in table.iter('tr')
+                slots = [(rows, len(rows)) for rows in open_tables]
+                for rows, _ in slots:
+                    rows.append(None)
+                open_rows.append(slots)
+            else:
+                cell_texts = [''.join(t.strip() for t in CELL_TEXT(cell))
+                              for cell in elem.iter('td', 'th')]
+                for rows, i in open_rows.pop():
+                    rows[i] = cell_texts
+                # Le righe annidate servono ancora al testo della riga esterna
+                if not open_rows:
+                    elem.clear()
+
+    fed = False
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+            fed = True
+            consume_events()
+    # Senza dati parser.close() solleverebbe un errore: pagina vuota, nessuna tabella
+    if not fed:
+        return []
+    parser.close()
+    consume_events()
+    return tables
 
-    tables = soup.find_all('table')
 
-    for table in tables:
-        rows = table.find_all('tr')
+def extract_table_rows(html):
+    """
+    Estrae le righe delle tabelle da un testo HTML già scaricato.
+
+    Returns:
+        list di tabelle, ognuna list di righe (list di testi delle celle)
+    """
+    if not html or not html.strip():
+        return []
+    data = html.encode('utf-8')
+    return stream_table_rows(data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
 
-        for row in rows:
-            cells = row.find_all(['td', 'th'])
 
-            if len(cells) >= 8:
-                cell_texts = [c.get_text(strip=True) for c in cells]
+def parse_serie_b_standings(html):
+    """
+    Estrae le classifiche Serie B dall'HTML della pagina.
 
+    Returns:
+        dict con {'girone_a': [...], 'girone_b': [...]}
+    """
+    results = {'girone_a': [], 'girone_b': []}
+
+    for rows in extract_table_rows(html):
+        for cell_texts in rows:
+            if len(cell_texts) >= 8:
                 if 'Pti' in cell_texts or 'PF' in cell_texts:
                     continue
 
-                team_cell = cells[0]
-                team_name = team_cell.get_text(strip=True)
+                team_name = cell_texts[0]
 
                 if not team_name or team_name.isdigit():
                     continue
 
                 try:
+                    pts, gp, wins, losses = map(_to_int, cell_texts[1:5])
+                    pf, ps = map(_to_int, cell_texts[6:8])
                     data = {
                         'team': team_name,
-                        'pts': int(cell_texts[1]) if cell_texts[1].isdigit() else 0,
-                        'gp': int(cell_texts[2]) if cell_texts[2].isdigit() else 0,
-                        'wins': int(cell_texts[3]) if cell_texts[3].isdigit() else 0,
-                        'losses': int(cell_texts[4]) if cell_texts[4].isdigit() else 0,
-                        'pf': int(cell_texts[6]) if len(cell_texts) > 6 and cell_texts[6].isdigit() else 0,
-                        'ps': int(cell_texts[7]) if len(cell_texts) > 7 and cell_texts[7].isdigit() else 0,
+                        'pts': pts,
+                        'gp': gp,
+                        'wins': wins,
+                        'losses': losses,
+                        'pf': pf,
+                        'ps': ps,
                     }
 
                     if len(results['girone_a']) < 19:
@@ -108,63 +305,66 @@ def scrape_serie_b_standings(driver):
     return results
 
 
-def scrape_serie_b_girone_b_standings(driver):
+def scrape_serie_b_both(driver):
     """
-    Scrape classifica Serie B Girone B cliccando sul tab specifico.
+    Scrape entrambi i gironi Serie B con un solo caricamento della pagina:
+    prima il Girone A (tab attivo), poi click sul tab del Girone B.
 
     Returns:
-        list di standings per girone B
+        dict con {'girone_a': [...], 'girone_b': [...]}
     """
     from selenium.webdriver.common.by import By
 
-    url = "https://www.legapallacanestro.com/serie/4/classifica"
-    driver.get(url)
-    time.sleep(3)
+    results = {
+        'girone_a': scrape_serie_b_standings(driver)['girone_a'],
+        'girone_b': [],
+    }
 
-    # Clicca sul tab Girone B
+    # Clicca sul tab Girone B e attende l'header della classifica nel pannello
+    # corrispondente (una riga qualsiasi potrebbe essere pre-renderizzata o di caricamento)
     try:
         tab_b = driver.find_element(By.ID, "quicktabs-tab-campionato-selector-1")
         driver.execute_script("arguments[0].click();", tab_b)
-        time.sleep(3)
+        wait_for_element(
+            driver, "//*[@id='quicktabs-tabpage-campionato-selector-1']//tr[contains(., 'Pti')]",
+            by=By.XPATH)
     except Exception as e:
         print(f"Errore click tab Girone B: {e}")
-        return []
+        return results
 
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
+    results['girone_b'] = parse_serie_b_girone_b_standings(driver.page_source)
+    return results
 
+
+def parse_serie_b_girone_b_standings(html):
+    """
+    Estrae la classifica del girone mostrato (tab attivo) dall'HTML della pagina.
+
+    Returns:
+        list di standings
+    """
     results = []
 
     # Trova la tabella con l'header delle classifiche (Pti, G, V, P)
-    tables = soup.find_all('table')
-
-    standings_table = None
-    for table in tables:
-        rows = table.find_all('tr')
-        for row in rows[:2]:  # Controlla solo prime 2 righe per header
-            cells = row.find_all(['td', 'th'])
-            texts = [c.get_text(strip=True) for c in cells]
+    standings_rows = None
+    for rows in extract_table_rows(html):
+        for texts in rows[:2]:  # Controlla solo prime 2 righe per header
             if 'Pti' in texts or ('G' in texts and 'V' in texts):
-                standings_table = table
+                standings_rows = rows
                 break
-        if standings_table:
+        if standings_rows:
             break
 
-    if not standings_table:
+    if not standings_rows:
         return []
 
-    rows = standings_table.find_all('tr')
-
-    for row in rows:
-        cells = row.find_all(['td', 'th'])
-
-        if len(cells) >= 5:
-            cell_texts = [c.get_text(strip=True) for c in cells]
-
+    for cell_texts in standings_rows:
+        if len(cell_texts) >= 5:
             # Salta header
             if 'Pti' in cell_texts or ('G' in cell_texts and 'V' in cell_texts):
                 continue
 
-            team_name = cells[0].get_text(strip=True)
+            team_name = cell_texts[0]
 
             if not team_name or team_name.isdigit():
                 continue
@@ -174,14 +374,15 @@ def scrape_serie_b_girone_b_standings(driver):
                 break
 
             try:
+                pts, gp, wins, losses = map(_to_int, cell_texts[1:5])
                 data = {
                     'team': team_name,
-                    'pts': int(cell_texts[1]) if cell_texts[1].isdigit() else 0,
-                    'gp': int(cell_texts[2]) if cell_texts[2].isdigit() else 0,
-                    'wins': int(cell_texts[3]) if cell_texts[3].isdigit() else 0,
-                    'losses': int(cell_texts[4]) if cell_texts[4].isdigit() else 0,
-                    'pf': int(cell_texts[6]) if len(cell_texts) > 6 and cell_texts[6].isdigit() else 0,
-                    'ps': int(cell_texts[7]) if len(cell_texts) > 7 and cell_texts[7].isdigit() else 0,
+                    'pts': pts,
+                    'gp': gp,
+                    'wins': wins,
+                    'losses': losses,
+                    'pf': _to_int(cell_texts[6]) if len(cell_texts) > 6 else 0,
+                    'ps': _to_int(cell_texts[7]) if len(cell_texts) > 7 else 0,
                 }
                 results.append(data)
             except (ValueError, IndexError):
@@ -197,34 +398,40 @@ def scrape_serie_a2_standings(driver):
     Returns:
         list di standings
     """
-    # URL corretto per A2
-    url = "https://www.legapallacanestro.com/serie-a2/classifica"
-    driver.get(url)
-    time.sleep(4)
+    driver.get(SERIE_A2_URL)
+    wait_for_element(driver, "table tr")
+    return parse_serie_a2_standings(driver.page_source)
 
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
 
-    results = []
+def parse_serie_a2_standings(html):
+    """
+    Estrae la classifica Serie A2 dall'HTML della pagina.
 
-    # Trova tutte le tabelle
-    tables = soup.find_all('table')
+    Returns:
+        list di standings
+    """
+    return parse_serie_a2_tables(extract_table_rows(html))
 
-    for table in tables:
-        rows = table.find_all('tr')
 
-        for row in rows:
-            cells = row.find_all(['td', 'th'])
+def parse_serie_a2_tables(tables):
+    """
+    Estrae la classifica Serie A2 dalle righe delle tabelle (extract_table_rows).
 
+    Returns:
+        list di standings
+    """
+    results = []
+
+    for rows in tables:
+        for cell_texts in rows:
             # Header A2: ['', 'P', 'G', 'V', 'P', '%', ...]
             # Prima cella vuota, poi Pti, G, V, P(losses)
-            if len(cells) >= 5:
-                cell_texts = [c.get_text(strip=True) for c in cells]
-
+            if len(cell_texts) >= 5:
                 # Salta header (contiene 'G' o 'V' come header)
                 if 'G' in cell_texts and 'V' in cell_texts and 'P' in cell_texts:
                     continue
 
-                team_name = cells[0].get_text(strip=True)
+                team_name = cell_texts[0]
 
                 # Salta righe vuote o numeri
                 if not team_name or team_name.isdigit():
@@ -247,10 +454,10 @@ def scrape_serie_a2_standings(driver):
                         'team': team_name,
                         'pts': int(pts_str),
                         'gp': int(gp_str),
-                        'wins': int(cell_texts[3]) if len(cell_texts) > 3 and cell_texts[3].isdigit() else 0,
-                        'losses': int(cell_texts[4]) if len(cell_texts) > 4 and cell_texts[4].isdigit() else 0,
-                        'pf': int(cell_texts[6]) if len(cell_texts) > 6 and cell_texts[6].isdigit() else 0,
-                        'ps': int(cell_texts[7]) if len(cell_texts) > 7 and cell_texts[7].isdigit() else 0,
+                        'wins': _to_int(cell_texts[3]),
+                        'losses': _to_int(cell_texts[4]),
+                        'pf': _to_int(cell_texts[6]) if len(cell_texts) > 6 else 0,
+                        'ps': _to_int(cell_texts[7]) if len(cell_texts) > 7 else 0,
                     }
 
                     # Evita duplicati
@@ -263,51 +470,76 @@ def scrape_serie_a2_standings(driver):
     return results
 
 
+def _scrape_with_own_driver(scrape):
+    """Esegue uno scraper con un'istanza del browser dedicata."""
+    from functions.scraper import create_driver
+
+    with _DRIVER_LOCK:
+        driver = create_driver()
+    try:
+        return scrape(driver)
+    finally:
+        driver.quit()
+
+
 def refresh_all_standings():
     """
     Scarica tutte le classifiche ufficiali e le salva in cache.
-    Richiede browser Selenium.
+    Usa l'HTML statico quando contiene le tabelle, altrimenti Selenium.
 
     Returns:
         dict con tutte le standings
     """
-    from functions.scraper import create_driver
+    print("Scaricando classifiche ufficiali LNP...")
 
-    driver = create_driver()
+    standings = {}
 
-    try:
-        print("Scaricando classifiche ufficiali LNP...")
-
-        # Serie B Girone A
-        print("  - Serie B Girone A...")
-        serie_b = scrape_serie_b_standings(driver)
-        save_standings_cache('b_a', serie_b['girone_a'])
-        print(f"    Salvate {len(serie_b['girone_a'])} squadre")
-
-        # Serie B Girone B (richiede click su tab)
-        print("  - Serie B Girone B...")
-        girone_b = scrape_serie_b_girone_b_standings(driver)
-        save_standings_cache('b_b', girone_b)
-        print(f"    Salvate {len(girone_b)} squadre")
-
-        # Serie A2
-        print("  - Serie A2...")
-        serie_a2 = scrape_serie_a2_standings(driver)
-        save_standings_cache('a2', serie_a2)
-        print(f"    Salvate {len(serie_a2)} squadre")
-
-        print("Classifiche ufficiali aggiornate!")
-
-        return {
-            'b_a': serie_b['girone_a'],
-            'b_b': girone_b,
-            'a2': serie_a2
-        }
+    def save_page(name, result):
+        # Ogni pagina viene salvata appena disponibile, indipendentemente dalle altre
+        if name == 'serie_b':
+            pages = [('b_a', 'Serie B Girone A', result['girone_a']),
+                     ('b_b', 'Serie B Girone B', result['girone_b'])]
+        else:
+            pages = [('a2', 'Serie A2', result)]
+        for campionato, label, data in pages:
+            save_standings_cache(campionato, data)
+            standings[campionato] = data
+            print(f"  - {label}: salvate {len(data)} squadre")
+
+    # Serie A2 dall'HTML statico (senza browser), se contiene le tabelle
+    scrapers = {'serie_b': scrape_serie_b_both}
+    tables = fetch_table_rows(SERIE_A2_URL)
+    serie_a2 = parse_serie_a2_tables(tables) if tables else []
+    if serie_a2:
+        save_page('serie_a2', serie_a2)
+    else:
+        scrapers['serie_a2'] = scrape_serie_a2_standings
+
+    # Browser solo dove serve: Serie B (il Girone B richiede il click sul tab,
+    # entrambi i gironi con un solo caricamento) e A2 se l'HTML statico non basta;
+    # un'istanza per pagina, in parallelo. Un errore su una pagina non impedisce
+    # di salvare le altre: viene rilanciato solo alla fine.
+    errors = []
+    with ThreadPoolExecutor(max_workers=len(scrapers)) as executor:
+        futures = {executor.submit(_scrape_with_own_driver, scrape): name
+                   for name, scrape in scrapers.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                save_page(name, future.result())
+            except Exception as e:
+                print(f"Errore scraping {name}: {e}")
+                errors.append(e)
 
-    finally:
-        driver.quit()
+    if errors:
+        raise errors[0]
 
+    print("Classifiche ufficiali aggiornate!")
 
+    return standings
+
+
+@lru_cache(maxsize=512)
 def normalize_team_name_for_match(name):
     """
     Normalizza nome squadra per matching tra fonti.
@@ -315,44 +547,11 @@ def normalize_team_name_for_match(name):
     """
     name = name.lower().strip()
 
-    # Mappatura diretta per casi problematici (squadre con stessa città)
-    direct_mappings = {
-        'gema montecatini': 'gema montecatini',
-        'gema': 'gema montecatini',
-        'la t tecnica': 'gema montecatini',
-        'herons montecatini': 'herons montecatini',
-        'herons': 'herons montecatini',
-        'fabo': 'herons montecatini',
-        'bakery': 'bakery piacenza',
-        'assigeco': 'assigeco piacenza',
-        'ucc assigeco': 'assigeco piacenza',
-        'andrea costa': 'andrea costa imola',
-        'virtus imola': 'virtus imola',
-    }
-
-    for key, val in direct_mappings.items():
+    for key, val in TEAM_DIRECT_MAPPINGS.items():
         if key in name:
             return val
 
-    # Parole chiave identificative (escluse città con più squadre gestite sopra)
-    keywords = [
-        'vigevano', 'orzinuovi', 'vendemiano', 'lumezzane',
-        'desio', 'omegna', 'agrigento', 'fidenza', 'legnano',
-        'treviglio', 'monferrato', 'vicenza', 'armerina', 'fiorenzuola',
-        'orlando', 'livorno', 'avellino', 'fortitudo', 'casoria', 'nardò',
-        'chiusi', 'latina', 'rieti', 'cento', 'forlì',
-        'cantù', 'torino', 'udine', 'verona', 'cremona', 'rimini',
-        'pesaro', 'scafati', 'mestre', 'ferrara', 'roseto', 'milano',
-        'varese', 'trieste', 'pistoia', 'napoli', 'brindisi', 'sassari',
-        'cagliari', 'pavia', 'teramo', 'mantova', 'bergamo', 'ancona',
-        'civitanova', 'ravenna', 'jesi', 'fabriano', 'siena', 'arezzo',
-        'ozzano', 'san miniato', 'empoli', 'piombino',
-        'faenza', 'cesena', 'senigallia', 'san severo', 'monopoli',
-        'ruvo', 'corato', 'bisceglie', 'molfetta', 'taranto', 'cerignola',
-        'salerno', 'battipaglia', 'torre del greco', 'portici', 'castellammare'
-    ]
-
-    for kw in keywords:
+    for kw in TEAM_KEYWORDS:
         if kw in name:
             return kw
 
@@ -375,6 +574,24 @@ def get_official_standings(campionato):
     return None
 
 
+def get_official_index(campionato, official):
+    """
+    Crea indice {nome normalizzato: dati ufficiali} per il matching.
+    Riusa quello già costruito finché la classifica in cache non cambia.
+    """
+    memo = _OFFICIAL_INDEX_MEMO.get(campionato)
+    # load_cached_standings restituisce lo stesso oggetto se il file non è cambiato
+    if memo and memo[0] is official:
+        return memo[1]
+
+    official_by_key = {}
+    for team_data in official:
+        key = normalize_team_name_for_match(team_data['team'])
+        official_by_key[key] = team_data
+    _OFFICIAL_INDEX_MEMO[campionato] = (official, official_by_key)
+    return official_by_key
+
+
 def merge_standings(calculated_standings, campionato):
     """
     Unisce le classifiche calcolate con quelle ufficiali.
@@ -393,11 +610,8 @@ def merge_standings(calculated_standings, campionato):
         # Nessun dato ufficiale, usa calcolati
         return calculated_standings
 
-    # Crea indice per matching veloce
-    official_by_key = {}
-    for team_data in official:
-        key = normalize_team_name_for_match(team_data['team'])
-        official_by_key[key] = team_data
+    # Indice per matching veloce
+    official_by_key = get_official_index(campionato, official)
 
     # Correggi standings calcolate
     corrected = []
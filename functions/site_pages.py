@@ -641,8 +641,8 @@ def generate_squadre_vittorie_sconfitte(campionato_filter, camp_name):
             // Statistiche "Noi" (fatte)
             const statsNoi = data.data.filter(r => r['Tipo'] === 'Noi').sort((a, b) => Math.abs(b['Diff %']) - Math.abs(a['Diff %']));
             const statsAvv = data.data.filter(r => r['Tipo'] === 'Avversari').sort((a, b) => Math.abs(b['Diff %']) - Math.abs(a['Diff %']));
-            const maxPctNoi = Math.max(...statsNoi.map(r => Math.abs(r['Diff %'])));
-            const maxPctAvv = Math.max(...statsAvv.map(r => Math.abs(r['Diff %'])));
+            const maxPctNoi = statsNoi.reduce((m, r) => Math.max(m, Math.abs(r['Diff %'])), -Infinity);
+            const maxPctAvv = statsAvv.reduce((m, r) => Math.max(m, Math.abs(r['Diff %'])), -Infinity);
 
             // Sezione Statistiche Fatte
             html += '<h3 style="margin-bottom: 10px;">Statistiche fatte <span class="info-tooltip" data-tip="Come cambiano le nostre statistiche quando la squadra vince vs quando perde.">ⓘ</span></h3>';
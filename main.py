@@ -20,7 +20,8 @@ from functions.analysis import (
     load_all_data,
     preprocess_data,
     compute_aggregated_stats,
-    create_all_plots
+    create_all_plots,
+    prune_plots_cache
 )
 from functions.report import generate_html_report, save_report
 from functions.player_cards import compute_player_stats, generate_players_report
@@ -126,6 +127,11 @@ def cmd_report(args):
         save_report(html_content, "reports/stats_LNP_b_combined.html", open_browser=False)
         generated.append("reports/stats_LNP_b_combined.html")
 
+    # Grafici in cache non più usati da nessun report
+    removed = prune_plots_cache()
+    if removed:
+        print(f"Cache grafici: eliminati {removed} file non più usati")
+
     print(f"\n{'='*50}")
     print(f"Report generati: {len(generated)}")
     for r in generated: